@@ -0,0 +1,89 @@
+"""
+Benchmark of the CSVReaderNode parsing options.
+
+A CSV file of roughly `--size-mb` megabytes with `--columns` numeric and string
+columns is generated (once, and reused if it already exists), and then read
+with each configuration below. Only `--usecols` of the columns are needed by
+the "projected" configurations.
+
+Usage:
+    python benchmarks/bench_csv_reader.py --size-mb 1024 --columns 30 --usecols 3
+"""
+import argparse
+import tempfile
+import time
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gnime.nodes.io import CSVReaderNode  # noqa: E402
+
+
+def generate(path: str, size_mb: int, columns: int) -> None:
+    rng = np.random.default_rng(0)
+    rows = 100_000
+    target = size_mb * 1024 * 1024
+    header = True
+    with open(path, 'w') as f:
+        while f.tell() < target:
+            data = {}
+            for i in range(columns):
+                if i % 3 == 2:
+                    data['c%d' % i] = rng.choice(['alpha', 'beta', 'gamma', 'delta'], rows)
+                elif i % 3 == 1:
+                    data['c%d' % i] = rng.random(rows)
+                else:
+                    data['c%d' % i] = rng.integers(0, 1_000_000, rows)
+            pd.DataFrame(data).to_csv(f, header=header, index=False)
+            header = False
+
+
+def configurations(columns: int, usecols: int) -> dict:
+    projected = ['c%d' % i for i in range(usecols)]
+    dtype = {
+        c: ('int64', 'float64', 'category')[i % 3] for i, c in enumerate(projected)}
+    return {
+        'c engine': {},
+        'c engine, memory_map': {'memory_map': True},
+        'c engine, usecols': {'usecols': projected},
+        'c engine, usecols + dtype': {'usecols': projected, 'dtype': dtype},
+        'pyarrow engine': {'engine': 'pyarrow'},
+        'pyarrow engine, usecols': {'engine': 'pyarrow', 'usecols': projected},
+        'pyarrow engine, usecols + dtype': {
+            'engine': 'pyarrow', 'usecols': projected, 'dtype': dtype},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size-mb', type=int, default=1024)
+    parser.add_argument('--columns', type=int, default=30)
+    parser.add_argument('--usecols', type=int, default=3)
+    parser.add_argument('--path', default=None)
+    args = parser.parse_args()
+
+    path = args.path or os.path.join(
+        tempfile.gettempdir(), 'gnime_bench_%dmb_%dcols.csv' % (args.size_mb, args.columns))
+    if not os.path.exists(path):
+        print('Generating %s' % path)
+        generate(path, args.size_mb, args.columns)
+    print('%s: %.0f MB' % (path, os.path.getsize(path) / 1024 / 1024))
+
+    baseline = None
+    for name, options in configurations(args.columns, args.usecols).items():
+        node = CSVReaderNode('reader', config={'file_path': path, **options})
+        start = time.perf_counter()
+        df = node.execute()
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print('%-34s %8.2f s  %5.1fx  (%d rows x %d cols)' % (
+            name, elapsed, baseline / elapsed, len(df), len(df.columns)))
+        del df
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark of the per-level overhead of the worker pool used by
+Pipeline.start.
+
+Two strategies are compared on a pipeline made of `--levels` levels of
+`--width` no-op stages:
+
+    per-level: a new ThreadPool is created for every topological group, as
+               Pipeline.start used to do (the pool is closed here so that the
+               numbers are not skewed by leaked threads).
+    reused:    the pipeline owns one pool that is reused across groups and
+               runs.
+
+Usage:
+    python benchmarks/bench_pool.py --levels 50 --width 8 --cores 4 --runs 5
+"""
+from multiprocessing.pool import ThreadPool
+import argparse
+import tempfile
+import threading
+import time
+import sys
+import os
+
+import diskcache
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gnime.pipeline import Pipeline  # noqa: E402
+from gnime.stage import DiskCacheStage  # noqa: E402
+
+
+class NoopStage(DiskCacheStage):
+
+    def __init__(self, cache, name):
+        DiskCacheStage.__init__(self, cache)
+        self._name = name
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def run(self):
+        pass
+
+    def execute(self):
+        self.run()
+
+
+def build_pipeline(cache, levels: int, width: int) -> Pipeline:
+    pipeline = Pipeline(cache)
+    previous = []
+    for level in range(levels):
+        current = [
+            NoopStage(cache, 'stage_%d_%d' % (level, i)) for i in range(width)]
+        for stage in current:
+            for preceding_stage in previous:
+                stage.after(preceding_stage)
+        pipeline.add_stages(current)
+        previous = current
+    return pipeline
+
+
+def per_level_pool(pipeline: Pipeline, num_cores: int) -> None:
+    for group in pipeline.topological_sort_grouped():
+        pool = ThreadPool(num_cores)
+        pool.map(pipeline.run_stage, group)
+        pool.close()
+        pool.join()
+
+
+def reused_pool(pipeline: Pipeline, num_cores: int) -> None:
+    pool = pipeline.get_pool(num_cores)
+    for group in pipeline.topological_sort_grouped():
+        pool.map(pipeline.run_stage, group)
+
+
+def bench(fn, pipeline: Pipeline, args) -> float:
+    timings = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        fn(pipeline, args.cores)
+        timings.append(time.perf_counter() - start)
+    return min(timings) / args.levels
+
+
+def count_threads():
+    # The sampler measuring the memory of profiled stages is started on first
+    # use and lives as long as the process, so it is not a leak.
+    return sum(thread.name != 'gnime-rss-sampler' for thread in threading.enumerate())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--levels', type=int, default=50)
+    parser.add_argument('--width', type=int, default=8)
+    parser.add_argument('--cores', type=int, default=4)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    cache = diskcache.Cache(tempfile.mkdtemp())
+    with build_pipeline(cache, args.levels, args.width) as pipeline:
+        before = bench(per_level_pool, pipeline, args)
+        after = bench(reused_pool, pipeline, args)
+
+        threads = count_threads()
+        for _ in range(args.runs):
+            pipeline.start(num_cores=args.cores)
+        leaked = count_threads() - threads
+
+    print('levels=%d width=%d cores=%d' % (args.levels, args.width, args.cores))
+    print('per-level pool: %8.1f us/level' % (before * 1e6))
+    print('reused pool:    %8.1f us/level' % (after * 1e6))
+    print('threads leaked over %d runs of start(): %d' % (args.runs, leaked))
+
+
+if __name__ == '__main__':
+    main()
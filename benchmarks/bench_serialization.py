@@ -0,0 +1,89 @@
+"""
+Micro-benchmark of the port payload serializers.
+
+Every serializer of gnime.serialization is timed on a set of typical port
+payloads: a numeric DataFrame of `--rows` rows, a DataFrame mixing numeric,
+low-cardinality string and sorted integer columns, a large NumPy array of
+random floats (incompressible) and a small dict. For each payload the
+serialized size and the best time of `--repeat` dumps and loads are reported,
+relative to the default PickleSerializer.
+
+Usage:
+    python benchmarks/bench_serialization.py --rows 1000000 --repeat 5
+"""
+import argparse
+import time
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gnime.serialization import (  # noqa: E402
+    PickleSerializer, CloudPickleSerializer, Pickle5Serializer, AutoSerializer,
+    available_codecs, deserialize_any)
+
+
+def payloads(rows: int) -> dict:
+    rng = np.random.default_rng(0)
+    return {
+        'numeric DataFrame': pd.DataFrame({
+            'c%d' % i: rng.integers(0, 1000, rows) if i % 2 else rng.random(rows)
+            for i in range(8)
+        }),
+        'mixed DataFrame': pd.DataFrame({
+            'id': np.arange(rows),
+            'value': rng.random(rows),
+            'label': rng.choice(['alpha', 'beta', 'gamma', 'delta'], rows),
+            'flag': rng.integers(0, 2, rows).astype(bool),
+        }),
+        'random ndarray': rng.random(rows * 4),
+        'small dict': {'rows': rows, 'columns': ['a', 'b', 'c'], 'ok': True},
+    }
+
+
+def serializers() -> dict:
+    candidates = {
+        'pickle': PickleSerializer(),
+        'cloudpickle': CloudPickleSerializer(),
+        'pickle5': Pickle5Serializer(),
+    }
+    for codec in available_codecs():
+        candidates['pickle5 + %s' % codec] = Pickle5Serializer(codec)
+    candidates['auto'] = AutoSerializer()
+    return candidates
+
+
+def best_time(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for payload_name, payload in payloads(args.rows).items():
+        print('\n%s' % payload_name)
+        print('  %-18s %12s %7s %11s %11s' % ('serializer', 'size', 'ratio', 'dumps', 'loads'))
+        baseline = None
+        for name, serializer in serializers().items():
+            serialized = serializer.serialize(payload)
+            dumps = best_time(lambda: serializer.serialize(payload), args.repeat)
+            loads = best_time(lambda: deserialize_any(serialized), args.repeat)
+            baseline = baseline or (len(serialized), dumps, loads)
+            print('  %-18s %12d %6.2fx %8.2f ms %8.2f ms  (%.1fx / %.1fx)' % (
+                name, len(serialized), baseline[0] / len(serialized),
+                dumps * 1e3, loads * 1e3, baseline[1] / dumps, baseline[2] / loads))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,31 @@
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List
+import threading
+import sys
+import uuid
+import os
 
+import pandas as pd
 import diskcache
 
-from .exceptions import InvalidCacheTypeException, InvalidKeyTypeException, InvalidValueTypeException
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover
+    pa = None
+
+from .exceptions import (
+    InvalidCacheTypeException, InvalidKeyTypeException,
+    InvalidValueTypeException, MissingDependencyException)
 
 
 class Cache(ABC):
     """
     Abstract base class for all cache implementations. ALl subclasses must
-    implement a read, write, and delete method.
+    implement a read, write, and delete method. The bulk read_many and
+    write_many methods default to one read or write per key, and can be
+    overridden by caches able to batch them.
     """
 
     @abstractmethod
@@ -23,33 +40,54 @@ class Cache(ABC):
     def delete(self, *args, **kwargs):
         ...
 
+    def read_many(self, keys: List[str]) -> list:
+        """Read the values of several keys, in the order of the keys."""
+        return [self.read(k) for k in keys]
+
+    def write_many(self, items: Dict[str, object]) -> None:
+        """Write several key-value pairs."""
+        for k, v in items.items():
+            self.write(k, v)
+
 
 class DiskCache(Cache):
     """
     Implementation for a disk cache to be used by users who wish to inherit
     this functionality. We use the diskcache Python package from pypi to
     implement this caching feature.
+
+    Keys are scoped to a namespace: when one is set, every key is prefixed
+    with it, so that several pipelines (or runs) can share one cache
+    directory without their keys colliding. The empty namespace leaves keys
+    as they are.
     """
 
-    def __init__(self, disk_cache: diskcache.Cache):
+    namespace: str = ''
+
+    def __init__(self, disk_cache: diskcache.Cache, namespace: str = None):
         if not isinstance(disk_cache, diskcache.Cache):
             raise InvalidCacheTypeException(
                 'Please ensure disk_cache is of type diskcache.Cache')
 
         self.disk_cache = disk_cache
+        if namespace is not None:
+            self.namespace = namespace
 
-    def read(self, k: str) -> bytes:
-        """Read a value from the disk cache given the associated string key."""
+    def key(self, k: str) -> str:
+        """The key under which k is stored in the disk cache."""
         if not isinstance(k, str):
             raise InvalidKeyTypeException('Please ensure key is a string')
 
+        return '%s:%s' % (self.namespace, k) if self.namespace else k
+
+    def read(self, k: str) -> bytes:
+        """Read a value from the disk cache given the associated string key."""
         # return self.disk_cache[k]
-        return self.disk_cache.get(k)
+        return self.disk_cache.get(self.key(k))
 
     def write(self, k: str, v: bytes) -> None:
         """Write a value to the disk cache given a key-value pair."""
-        if not isinstance(k, str):
-            raise InvalidKeyTypeException('Please ensure key is a string')
+        k = self.key(k)
 
         if not isinstance(v, (str, bytes)):
             raise InvalidValueTypeException(
@@ -59,7 +97,179 @@ class DiskCache(Cache):
 
     def delete(self, k: str) -> None:
         """Delete a value from disk cache given the associated string key."""
+        self.disk_cache.delete(self.key(k))
+
+    def read_many(self, keys: List[str]) -> List[bytes]:
+        """
+        Read the values of several keys from the disk cache in a single
+        transaction, in the order of the keys.
+        """
+        keys = [self.key(k) for k in keys]
+        with self.disk_cache.transact():
+            return [self.disk_cache.get(k) for k in keys]
+
+    def write_many(self, items: Dict[str, bytes]) -> None:
+        """Write several key-value pairs to the disk cache in a single transaction."""
+        items = {self.key(k): v for k, v in items.items()}
+        if not all(isinstance(v, (str, bytes)) for v in items.values()):
+            raise InvalidValueTypeException(
+                'Please ensure value is of type string or bytes')
+
+        with self.disk_cache.transact():
+            for k, v in items.items():
+                self.disk_cache[k] = v
+
+    def exists(self, k: str) -> bool:
+        """Whether the disk cache holds a value for the given string key."""
+        return self.key(k) in self.disk_cache
+
+
+class MemoryCache(Cache):
+    """
+    Implementation for an in-process cache that holds references to Python
+    objects in a dictionary. Nothing is copied or serialized, so values are
+    shared by reference between the stages of a pipeline running in a single
+    process. It cannot be shared between processes.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, k: str) -> bool:
+        return k in self._values
+
+    def read(self, k: str, default: object = None) -> object:
+        """
+        Read a value from the memory cache given the associated key, or
+        return default if the key is missing.
+        """
+        if not isinstance(k, str):
+            raise InvalidKeyTypeException('Please ensure key is a string')
+
+        return self._values.get(k, default)
+
+    def write(self, k: str, v: object) -> None:
+        """Write a value to the memory cache given a key-value pair."""
+        if not isinstance(k, str):
+            raise InvalidKeyTypeException('Please ensure key is a string')
+
+        with self._lock:
+            self._values[k] = v
+
+    def delete(self, k: str) -> None:
+        """Delete a value from the memory cache given the associated key."""
         if not isinstance(k, str):
             raise InvalidKeyTypeException('Please ensure key is a string')
 
-        self.disk_cache.delete(k)
+        with self._lock:
+            self._values.pop(k, None)
+
+    def clear(self) -> None:
+        """Delete all values from the memory cache."""
+        with self._lock:
+            self._values.clear()
+
+    def keys(self) -> List[str]:
+        """Keys of the memory cache, from the oldest to the newest write."""
+        with self._lock:
+            return list(self._values)
+
+
+def estimate_size(value: object) -> int:
+    """
+    Estimate the memory held by a value in bytes. DataFrames and Series count
+    their data (including the contents of object columns), objects exposing
+    nbytes (e.g. numpy arrays) count their buffer, and any other value
+    counts its shallow size.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum())
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+@dataclass(frozen=True)
+class TableReference:
+    """
+    Placeholder written to the disk cache in place of a table that is stored
+    by an ArrowTableCache. Readers use the key to locate the table file.
+    """
+
+    key: str
+
+
+class ArrowTableCache(Cache):
+    """
+    Implementation for a cache of pandas DataFrames stored as uncompressed
+    Arrow IPC (Feather v2) files, one file per key, inside a directory. Tables
+    are read back through a memory map, so large tables are paged in lazily by
+    the OS instead of being copied out of a pickle, and files written by one
+    process can be read by any other process sharing the directory.
+    """
+
+    def __init__(self, directory: str):
+        if pa is None:
+            raise MissingDependencyException(
+                'Please install pyarrow to store tables as Arrow files')
+
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def supports(v: object) -> bool:
+        """Whether a value can be stored by this cache."""
+        return isinstance(v, pd.DataFrame)
+
+    def _path(self, k: str) -> str:
+        if not isinstance(k, str):
+            raise InvalidKeyTypeException('Please ensure key is a string')
+
+        return os.path.join(self.directory, '%s.arrow' % k)
+
+    def __contains__(self, k: str) -> bool:
+        return os.path.exists(self._path(k))
+
+    def size(self, k: str) -> int:
+        """Size in bytes of the table file for the given key."""
+        return os.path.getsize(self._path(k))
+
+    def read(self, k: str) -> pd.DataFrame:
+        """Read a memory-mapped table given the associated string key."""
+        path = self._path(k)
+        if not os.path.exists(path):
+            return None
+
+        table = feather.read_table(path, memory_map=True)
+        return table.to_pandas(split_blocks=True)
+
+    def write(self, k: str, v: pd.DataFrame) -> None:
+        """
+        Write a table to an Arrow file given a key-value pair. DataFrames that
+        Arrow cannot represent (e.g. object columns mixing strings and
+        numbers) raise InvalidValueTypeException.
+        """
+        if not self.supports(v):
+            raise InvalidValueTypeException(
+                'Please ensure value is of type pandas.DataFrame')
+
+        # Written under a temporary name first, so that readers never map a
+        # partially written file.
+        try:
+            table = pa.Table.from_pandas(v)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise InvalidValueTypeException(
+                'The DataFrame cannot be converted to an Arrow table: %s' % e) from e
+
+        path = self._path(k)
+        tmp_path = '%s.%s.tmp' % (path, uuid.uuid4().hex)
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+
+    def delete(self, k: str) -> None:
+        """Delete a table file given the associated string key."""
+        try:
+            os.remove(self._path(k))
+        except FileNotFoundError:
+            pass
@@ -12,14 +12,30 @@ class InvalidValueTypeException(Exception):
     pass
 
 
+class MissingDependencyException(Exception):
+    pass
+
+
 class InvalidStageTypeException(Exception):
     pass
 
 
+class InvalidExecutorTypeException(Exception):
+    pass
+
+
 class DAGVerificationException(Exception):
     pass
 
 
+class BatchMismatchException(Exception):
+    pass
+
+
+class EmptyInputException(Exception):
+    pass
+
+
 class SerializationException(Exception):
     pass
 
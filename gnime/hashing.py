@@ -0,0 +1,123 @@
+from inspect import getsource
+from types import BuiltinFunctionType, FunctionType
+from typing import List
+from enum import Enum
+import hashlib
+import pickle
+import json
+import os
+import threading
+
+from pydantic import BaseModel
+import pandas as pd
+
+
+def hash_bytes(data: bytes) -> str:
+    """Return the hex SHA-256 digest of a bytes object."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_value(value: object) -> str:
+    """
+    Return a digest of a port value. DataFrames are hashed row by row with
+    pandas, together with their column names and dtypes, so that equal frames
+    give equal digests regardless of how they were built. Frames pandas cannot
+    hash (e.g. with object columns holding lists or dicts), and every other
+    value, are hashed through their pickle.
+    """
+    if isinstance(value, pd.DataFrame):
+        try:
+            rows = pd.util.hash_pandas_object(value, index=True).values.tobytes()
+        except TypeError:
+            return hash_bytes(pickle.dumps(value))
+        digest = hashlib.sha256()
+        digest.update(repr(list(value.columns)).encode())
+        digest.update(repr(list(value.dtypes.astype(str))).encode())
+        digest.update(rows)
+        return digest.hexdigest()
+
+    return hash_bytes(pickle.dumps(value))
+
+
+def _stable(value: object) -> object:
+    """
+    Return a JSON serializable form of a config value that json cannot
+    serialize, which only depends on the value and not on its identity.
+    Functions and classes are represented by their qualified name, other
+    objects by a digest of their pickle, and objects that cannot be pickled
+    (e.g. connections or locks) by their type only.
+    """
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (set, frozenset)):
+        return sorted(json.dumps(v, sort_keys=True, default=_stable) for v in value)
+    if isinstance(value, (type, FunctionType, BuiltinFunctionType)):
+        return '%s.%s' % (value.__module__, value.__qualname__)
+    try:
+        return hash_value(value)
+    except Exception:
+        return '%s.%s' % (type(value).__module__, type(value).__qualname__)
+
+
+def hash_config(config: object) -> str:
+    """
+    Return a digest of a stage or node configuration, which may be a plain
+    dict, a pydantic model, or a config object exposing a pydantic model
+    through a `settings` property. Equal configs give equal digests, also
+    when they hold values json cannot serialize (see _stable).
+    """
+    config = getattr(config, 'settings', config)
+    serialized = json.dumps(config, sort_keys=True, default=_stable)
+    return hash_bytes(serialized.encode())
+
+
+# inspect parses whole modules with ast, which is not thread-safe on every
+# Python version, so pipelines fingerprinting in several threads take turns.
+_source_lock = threading.Lock()
+
+
+def hash_source(cls: type) -> str:
+    """
+    Return a digest of the source code of a class. Classes whose source is not
+    available (e.g. defined in an interactive session) fall back to their
+    qualified name.
+    """
+    try:
+        with _source_lock:
+            source = getsource(cls)
+    except (OSError, TypeError):
+        source = '%s.%s' % (cls.__module__, cls.__qualname__)
+    return hash_bytes(source.encode())
+
+
+def _files(paths: List[str]) -> List[str]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in sorted(os.walk(path)):
+                files.extend(os.path.join(root, name) for name in sorted(names))
+        else:
+            files.append(path)
+    return files
+
+
+def fingerprint_files(paths: List[str], content: bool = False) -> str:
+    """
+    Return a fingerprint of a list of files or directories (which are walked
+    recursively). By default only the path, modification time and size of
+    each file are used, which is cheap but misses in-place rewrites that keep
+    both. With content set, the bytes of every file are hashed instead.
+    """
+    digest = hashlib.sha256()
+    for path in _files(paths):
+        digest.update(path.encode())
+        if content:
+            with open(path, 'rb') as f:
+                while block := f.read(1 << 20):
+                    digest.update(block)
+        else:
+            stat = os.stat(path)
+            digest.update(('%d:%d' % (stat.st_mtime_ns, stat.st_size)).encode())
+    return digest.hexdigest()
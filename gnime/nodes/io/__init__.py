@@ -1,2 +1,6 @@
 from .csvreader.node import CSVReaderNode
 from .csvwriter.node import CSVWriterNode
+from .featherreader.node import FeatherReaderNode
+from .featherwriter.node import FeatherWriterNode
+from .parquetreader.node import ParquetReaderNode
+from .parquetwriter.node import ParquetWriterNode
@@ -1,9 +1,27 @@
-from pydantic import BaseModel
+from typing import List, Literal, Union
+
+from pydantic import BaseModel, model_validator
 
 
 class CSVReaderContext(BaseModel):
 
-    file_path: str
+    file_path: Union[str, List[str]]  # path, glob pattern, or list of either
     delimiter: str = ','
     header: int = 0
     columns: list = None
+    chunk_size: int = None  # rows per batch; when set the node streams batches
+    usecols: list = None  # only these columns are parsed
+    dtype: dict = None  # column name -> dtype, skips type inference
+    engine: Literal['c', 'python', 'pyarrow'] = 'c'  # 'pyarrow' parses on multiple threads
+    memory_map: bool = False  # map the file into memory instead of buffered reads
+    num_workers: int = None  # threads parsing shards concurrently, defaults to the CPU count
+    concat: bool = True  # concatenate shards, otherwise stream one table per shard
+    fingerprint: Literal['stat', 'content'] = 'stat'  # how changes to the files are detected
+
+    @model_validator(mode='after')
+    def _check_engine_options(self):
+        if self.engine == 'pyarrow' and self.chunk_size:
+            raise ValueError('chunk_size is not supported by the pyarrow engine')
+        if self.engine == 'pyarrow' and self.memory_map:
+            raise ValueError('memory_map is not supported by the pyarrow engine')
+        return self
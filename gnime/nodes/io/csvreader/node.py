@@ -1,21 +1,111 @@
+from multiprocessing.pool import ThreadPool
+from collections import deque
+from typing import List
+import glob
+import os
+
 import pandas as pd
 
+from gnime.hashing import fingerprint_files
 from gnime.nodes.node import output_table
 from .config import CSVReaderConfig
 from gnime.core import Node
 
 
+def _is_pattern(path: str) -> bool:
+    return any(c in path for c in '*?[')
+
+
 @output_table(name="Output Data", description="The data read from the CSV file.")
 class CSVReaderNode(Node):
 
     def configure(self, context):
         self.config: CSVReaderConfig = CSVReaderConfig(context)
 
-    def execute(self):
+    @property
+    def paths(self) -> List[str]:
+        """The files to read, with glob patterns expanded in sorted order."""
+        file_path = self.config.settings.file_path
+        patterns = [file_path] if isinstance(file_path, str) else file_path
 
+        paths = []
+        for pattern in patterns:
+            if not _is_pattern(pattern):
+                paths.append(pattern)
+                continue
+            matches = sorted(glob.glob(pattern))
+            if not matches:
+                raise FileNotFoundError('No files match %s' % pattern)
+            paths.extend(matches)
+        return paths
+
+    def fingerprint(self) -> str:
+        """
+        Fingerprint of the files read, from their modification times and
+        sizes, or from their contents if `fingerprint` is set to "content".
+        """
+        return fingerprint_files(
+            self.paths, content=self.config.settings.fingerprint == 'content')
+
+    def _read_csv(self, path: str, **kwargs):
         return pd.read_csv(
-            self.config.settings.file_path,
+            path,
             delimiter=self.config.settings.delimiter,
             header=self.config.settings.header,
-            names=self.config.settings.columns
+            names=self.config.settings.columns,
+            usecols=self.config.settings.usecols,
+            dtype=self.config.settings.dtype,
+            engine=self.config.settings.engine,
+            memory_map=self.config.settings.memory_map,
+            **kwargs
         )
+
+    def _iter_chunks(self, paths: List[str]):
+        for path in paths:
+            with self._read_csv(path, chunksize=self.config.settings.chunk_size) as reader:
+                yield from reader
+
+    def _iter_shards(self, paths: List[str]):
+        """
+        Parse the files on a thread pool and yield them in path order. At
+        most one file per worker is parsed ahead of the consumer, so a slow
+        consumer holds a bounded number of shards in memory.
+        """
+        num_workers = self.config.settings.num_workers or os.cpu_count()
+        pool = ThreadPool(num_workers)
+        try:
+            pending = deque()
+            for path in paths:
+                if len(pending) >= num_workers:
+                    yield pending.popleft().get()
+                pending.append(pool.apply_async(self._read_csv, (path,)))
+            while pending:
+                yield pending.popleft().get()
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def execute(self):
+        """
+        Read the CSV file, or the files matched by the path patterns. If
+        `chunk_size` is set, an iterator of DataFrames of at most `chunk_size`
+        rows is returned instead of a single DataFrame, so that only one batch
+        has to be held in memory at a time.
+
+        Several files are parsed concurrently on `num_workers` threads (the C
+        and pyarrow parsers release the GIL for most of the parsing) and
+        concatenated, or, if `concat` is False, returned as an iterator of one
+        DataFrame per file, in path order.
+        """
+        paths = self.paths
+
+        if self.config.settings.chunk_size:
+            return self._iter_chunks(paths)
+
+        if len(paths) == 1:
+            return self._read_csv(paths[0])
+
+        if not self.config.settings.concat:
+            return self._iter_shards(paths)
+
+        return pd.concat(list(self._iter_shards(paths)), ignore_index=True)
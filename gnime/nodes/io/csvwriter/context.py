@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import BaseModel
 
 
@@ -7,3 +9,8 @@ class CSVWriterContext(BaseModel):
     delimiter: str = ','
     header: bool = True
     index: bool = False
+    chunk_size: int = None  # rows formatted per task; when set chunks are formatted in parallel
+    num_workers: int = None  # workers formatting chunks, defaults to the CPU count
+    executor: Literal['thread', 'process'] = 'thread'
+    compression: Literal['gzip', 'zstd'] = None
+    atomic: bool = True  # write to a temporary file renamed over file_path on success
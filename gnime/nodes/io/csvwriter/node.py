@@ -1,21 +1,138 @@
+from multiprocessing.pool import ThreadPool
+from multiprocessing import Pool
+from collections import deque
+import gzip
+import uuid
+import os
+
 import pandas as pd
 
-from gnime.nodes.node import input_table
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+from gnime.exceptions import MissingDependencyException
+from gnime.nodes.node import input_table, iter_batches, BatchMode
 from .config import CSVWriterConfig
 from gnime.core import Node
 
 
+EXECUTORS = {
+    'thread': ThreadPool,
+    'process': Pool,
+}
+
+
+def _sync(path: str) -> None:
+    """Flush a written file to disk, so that renaming it commits its content."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _format_chunk(chunk: pd.DataFrame, header: bool, **kwargs) -> bytes:
+    return chunk.to_csv(None, header=header, **kwargs).encode()
+
+
 @input_table(name="Input Data", description="The data to be written to a CSV file.")
 class CSVWriterNode(Node):
 
+    batch_mode = BatchMode.STREAM
+
     def configure(self, context):
         self.config: CSVWriterConfig = CSVWriterConfig(context)
+        if self.config.settings.compression == 'zstd' and zstandard is None:
+            raise MissingDependencyException(
+                'Please install zstandard to write zstd compressed files')
+
+    def _chunks(self, input):
+        chunk_size = self.config.settings.chunk_size
+        for batch in iter_batches(input):
+            for start in range(0, len(batch), chunk_size):
+                yield batch.iloc[start:start + chunk_size]
+
+    def _open(self, path: str):
+        raw = open(path, 'wb')
+        if self.config.settings.compression == 'gzip':
+            return raw, gzip.GzipFile(fileobj=raw, mode='wb')
+        if self.config.settings.compression == 'zstd':
+            return raw, zstandard.ZstdCompressor().stream_writer(raw)
+        return raw, raw
+
+    def _write_serial(self, f, input):
+        for idx, batch in enumerate(iter_batches(input)):
+            f.write(_format_chunk(
+                batch,
+                header=self.config.settings.header and idx == 0,
+                sep=self.config.settings.delimiter,
+                index=self.config.settings.index
+            ))
+
+    def _write_parallel(self, f, input):
+        """
+        Format chunks on a worker pool and write them in order. At most two
+        chunks per worker are in flight, which bounds memory use when the
+        input is a stream of batches.
+        """
+        num_workers = self.config.settings.num_workers or os.cpu_count()
+        pool = EXECUTORS[self.config.settings.executor](num_workers)
+        try:
+            pending = deque()
+            for idx, chunk in enumerate(self._chunks(input)):
+                if len(pending) >= 2 * num_workers:
+                    f.write(pending.popleft().get())
+                pending.append(pool.apply_async(_format_chunk, (chunk,), {
+                    'header': self.config.settings.header and idx == 0,
+                    'sep': self.config.settings.delimiter,
+                    'index': self.config.settings.index,
+                }))
+            while pending:
+                f.write(pending.popleft().get())
+        finally:
+            pool.terminate()
+            pool.join()
 
     def execute(self, input):
-        input.to_csv(
-            self.config.settings.file_path,
-            sep=self.config.settings.delimiter,
-            header=self.config.settings.header,
-            index=self.config.settings.index
-        )
+        """
+        Write the input to the CSV file. The input may be a DataFrame or an
+        iterator of DataFrames, in which case the batches are appended to the
+        file one at a time.
+
+        If `chunk_size` is set, the input is split into chunks of that many
+        rows which are formatted in parallel and written in order. Output can
+        be gzip or zstd compressed, and unless `atomic` is disabled it goes to
+        a temporary file in the same directory that replaces `file_path` only
+        once everything has been written and flushed to disk, so a failed
+        write never leaves a partial file behind.
+        """
+        file_path = self.config.settings.file_path
+        path = file_path
+        if self.config.settings.atomic:
+            directory, name = os.path.split(os.path.abspath(file_path))
+            path = os.path.join(directory, '.%s.%s.tmp' % (name, uuid.uuid4().hex))
+
+        raw = None
+        try:
+            raw, f = self._open(path)
+            if self.config.settings.chunk_size:
+                self._write_parallel(f, input)
+            else:
+                self._write_serial(f, input)
+            if f is not raw:
+                f.close()
+            raw.close()
+            if self.config.settings.atomic:
+                _sync(path)
+        except BaseException:
+            if raw is not None:
+                raw.close()
+            if self.config.settings.atomic and os.path.exists(path):
+                os.remove(path)
+            raise
+
+        if self.config.settings.atomic:
+            os.replace(path, file_path)
         return None
@@ -0,0 +1,161 @@
+from itertools import chain
+from typing import Iterator, List, Tuple
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from gnime.exceptions import EmptyInputException
+from gnime.nodes.node import iter_batches
+
+
+def _record_batches(data, index: bool) -> Tuple[pa.Schema, Iterator[pa.RecordBatch]]:
+    """
+    Convert a DataFrame, or an iterator of DataFrames, to an Arrow schema and a
+    lazy iterator of record batches sharing that schema. The schema is taken
+    from the first batch, so an empty iterator raises EmptyInputException.
+    """
+    batches = iter_batches(data)
+    try:
+        first = next(batches)
+    except StopIteration:
+        raise EmptyInputException(
+            'The input has no batches, so the schema of the output is unknown') from None
+    first = pa.RecordBatch.from_pandas(first, preserve_index=index)
+    rest = (
+        pa.RecordBatch.from_pandas(batch, schema=first.schema, preserve_index=index)
+        for batch in batches
+    )
+    return first.schema, chain([first], rest)
+
+
+def _ipc_codec(compression: str, compression_level: int = None) -> pa.Codec:
+    if compression in (None, 'none', 'uncompressed'):
+        return None
+    return pa.Codec(compression, compression_level=compression_level)
+
+
+def write_dataset(
+    data,
+    file_path: str,
+    file_format: str,
+    compression: str = None,
+    compression_level: int = None,
+    partition_cols: List[str] = None,
+    index: bool = False,
+) -> None:
+    """
+    Write table data to a Parquet or Feather file, or to a hive-style
+    partitioned directory of such files.
+
+    Parameters
+    ----------
+    data : Union[pd.DataFrame, Iterator[pd.DataFrame]]
+        The table, or batches of it, to write. Batches are converted and
+        written one at a time.
+    file_path : str
+        The file to write, or the base directory of a partitioned dataset.
+    file_format : str
+        Either "parquet" or "feather".
+    compression : str
+        The compression codec, or "none".
+    compression_level : int
+        The level of the compression codec, if it supports one.
+    partition_cols : List[str]
+        Columns to partition by. Each distinct combination of values is written
+        under `col=value/` subdirectories, using Arrow's multithreaded dataset
+        writer. Existing files of the written partitions are replaced.
+    index : bool
+        Whether to store the DataFrame index.
+    """
+    schema, batches = _record_batches(data, index)
+    compression = compression or 'none'
+
+    if partition_cols:
+        if file_format == 'parquet':
+            file_options = ds.ParquetFileFormat().make_write_options(
+                compression=compression, compression_level=compression_level)
+        else:
+            file_options = ds.IpcFileFormat().make_write_options(
+                compression=_ipc_codec(compression, compression_level))
+        ds.write_dataset(
+            batches,
+            file_path,
+            schema=schema,
+            format='parquet' if file_format == 'parquet' else 'ipc',
+            partitioning=partition_cols,
+            partitioning_flavor='hive',
+            basename_template='part-{i}.%s' % file_format,
+            file_options=file_options,
+            existing_data_behavior='delete_matching',
+            use_threads=True,
+        )
+        return
+
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if file_format == 'parquet':
+        with pq.ParquetWriter(
+                file_path, schema, compression=compression,
+                compression_level=compression_level) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+    else:
+        options = pa.ipc.IpcWriteOptions(
+            compression=_ipc_codec(compression, compression_level))
+        with pa.ipc.new_file(file_path, schema, options=options) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+
+
+def _as_tuples(filters: list) -> list:
+    # Filters coming from JSON or pydantic contexts are lists, pyarrow expects
+    # each predicate to be a tuple.
+    if isinstance(filters[0][0], str):
+        return [tuple(f) for f in filters]
+    return [[tuple(f) for f in conjunction] for conjunction in filters]
+
+
+def read_dataset(
+    file_path: str,
+    file_format: str,
+    columns: List[str] = None,
+    filters: list = None,
+) -> pd.DataFrame:
+    """
+    Read a Parquet or Feather file, or a hive-style partitioned directory of
+    such files, pushing the column projection and row filters down into the
+    scan so that only the required columns, row groups and partitions are read.
+
+    Parameters
+    ----------
+    file_path : str
+        The file, or base directory of a partitioned dataset, to read.
+    file_format : str
+        Either "parquet" or "feather".
+    columns : List[str]
+        The columns to read, all columns if None.
+    filters : list
+        Row filters in disjunctive normal form, as accepted by pyarrow, e.g.
+        `[("year", "=", 2024), ("value", ">", 0)]` or a list of such lists.
+
+    Returns
+    -------
+    pd.DataFrame
+        The table read.
+    """
+    dataset = ds.dataset(
+        file_path,
+        format='parquet' if file_format == 'parquet' else 'feather',
+        partitioning='hive',
+    )
+    table = dataset.to_table(
+        columns=columns,
+        filter=pq.filters_to_expression(_as_tuples(filters)) if filters else None,
+        use_threads=True,
+    )
+    return table.to_pandas()
@@ -0,0 +1,15 @@
+
+from .context import FeatherReaderContext
+
+
+class FeatherReaderConfig:
+
+    def __init__(self, context):
+        self._settings = self._validate_context(context)
+
+    def _validate_context(self, context):
+        return FeatherReaderContext(**context)
+
+    @property
+    def settings(self) -> FeatherReaderContext:
+        return self._settings
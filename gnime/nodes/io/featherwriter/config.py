@@ -0,0 +1,15 @@
+
+from .context import FeatherWriterContext
+
+
+class FeatherWriterConfig:
+
+    def __init__(self, context):
+        self._settings = self._validate_context(context)
+
+    def _validate_context(self, context):
+        return FeatherWriterContext(**context)
+
+    @property
+    def settings(self) -> FeatherWriterContext:
+        return self._settings
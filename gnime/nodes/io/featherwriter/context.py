@@ -0,0 +1,12 @@
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class FeatherWriterContext(BaseModel):
+
+    file_path: str  # file, or base directory when partitioned
+    compression: Literal['lz4', 'zstd', 'uncompressed'] = 'lz4'
+    compression_level: int = None
+    partition_cols: list = None  # hive-style partitioning columns
+    index: bool = False
@@ -0,0 +1,15 @@
+
+from .context import ParquetReaderContext
+
+
+class ParquetReaderConfig:
+
+    def __init__(self, context):
+        self._settings = self._validate_context(context)
+
+    def _validate_context(self, context):
+        return ParquetReaderContext(**context)
+
+    @property
+    def settings(self) -> ParquetReaderContext:
+        return self._settings
@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+
+class ParquetReaderContext(BaseModel):
+
+    file_path: str  # file, or base directory of a partitioned dataset
+    columns: list = None  # only these columns are read
+    filters: list = None  # row filters, e.g. [["year", "=", 2024]]
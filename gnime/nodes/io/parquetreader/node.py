@@ -0,0 +1,29 @@
+from gnime.hashing import fingerprint_files
+from gnime.nodes.node import output_table
+from gnime.nodes.io.dataset import read_dataset
+from .config import ParquetReaderConfig
+from gnime.core import Node
+
+
+@output_table(name="Output Data", description="The data read from the Parquet file.")
+class ParquetReaderNode(Node):
+
+    def configure(self, context):
+        self.config: ParquetReaderConfig = ParquetReaderConfig(context)
+
+    def fingerprint(self) -> str:
+        """Fingerprint of the files read, from their modification times and sizes."""
+        return fingerprint_files([self.config.settings.file_path])
+
+    def execute(self):
+        """
+        Read the Parquet file or partitioned directory. Only the configured
+        `columns` are read, and `filters` are applied during the scan, which
+        skips partitions and row groups that cannot match.
+        """
+        return read_dataset(
+            self.config.settings.file_path,
+            file_format='parquet',
+            columns=self.config.settings.columns,
+            filters=self.config.settings.filters
+        )
@@ -0,0 +1,15 @@
+
+from .context import ParquetWriterContext
+
+
+class ParquetWriterConfig:
+
+    def __init__(self, context):
+        self._settings = self._validate_context(context)
+
+    def _validate_context(self, context):
+        return ParquetWriterContext(**context)
+
+    @property
+    def settings(self) -> ParquetWriterContext:
+        return self._settings
@@ -0,0 +1,12 @@
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class ParquetWriterContext(BaseModel):
+
+    file_path: str  # file, or base directory when partitioned
+    compression: Literal['snappy', 'gzip', 'brotli', 'lz4', 'zstd', 'none'] = 'snappy'
+    compression_level: int = None
+    partition_cols: list = None  # hive-style partitioning columns
+    index: bool = False
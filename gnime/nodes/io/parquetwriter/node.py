@@ -0,0 +1,31 @@
+from gnime.nodes.node import input_table, BatchMode
+from gnime.nodes.io.dataset import write_dataset
+from .config import ParquetWriterConfig
+from gnime.core import Node
+
+
+@input_table(name="Input Data", description="The data to be written to a Parquet file.")
+class ParquetWriterNode(Node):
+
+    batch_mode = BatchMode.STREAM
+
+    def configure(self, context):
+        self.config: ParquetWriterConfig = ParquetWriterConfig(context)
+
+    def execute(self, input):
+        """
+        Write the input to a Parquet file, or to a hive-style partitioned
+        directory if `partition_cols` is set. The input may be a DataFrame or
+        an iterator of DataFrames, in which case the batches are written one
+        at a time.
+        """
+        write_dataset(
+            input,
+            self.config.settings.file_path,
+            file_format='parquet',
+            compression=self.config.settings.compression,
+            compression_level=self.config.settings.compression_level,
+            partition_cols=self.config.settings.partition_cols,
+            index=self.config.settings.index
+        )
+        return None
@@ -1,8 +1,11 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from collections import abc
+from typing import Iterator, List, Optional
 from inspect import signature
 from enum import Enum
 
+import pandas as pd
+
 from gnime.nodes.port import Port, PortType
 
 
@@ -75,7 +78,8 @@ def input_table(name: str, description: str = None, optional: Optional[bool] = F
     )
 
 
-def output_table(name: str, description: str = None):
+def output_table(name: str, description: str = None, retain: Optional[bool] = False,
+                 serializer=None):
     """
     Use this decorator to define an output port of type "Table" of a node.
 
@@ -85,12 +89,73 @@ def output_table(name: str, description: str = None):
         The name of the port.
     description : str
         Description of what the port is used for.
+    retain : bool
+        Whether the data is kept once every downstream consumer has read it.
+    serializer : gnime.serialization.Serializer
+        Serializer of the data written to the cache, overriding the one of
+        the node.
     """
     return lambda node_factory: _add_port(
-        node_factory, "output_ports", Port(PortType.TABLE, name, description)
+        node_factory,
+        "output_ports",
+        Port(PortType.TABLE, name, description, retain=retain, serializer=serializer),
     )
 
 
+def iter_batches(data) -> Iterator[pd.DataFrame]:
+    """
+    Iterate over the batches of table data received on a port. Source nodes
+    may produce either a single DataFrame or an iterator of DataFrames
+    (e.g. a CSV reader with a chunk size), and consumers that process their
+    input incrementally can handle both through this function.
+
+    Parameters
+    ----------
+    data : Union[pd.DataFrame, Iterator[pd.DataFrame]]
+        The data received on a table port.
+
+    Returns
+    -------
+    Iterator[pd.DataFrame]
+        The batches of the table. Anything that is not an iterator (such as a
+        DataFrame) is a single batch.
+    """
+    if isinstance(data, abc.Iterator):
+        yield from data
+    else:
+        yield data
+
+
+def collect_batches(data):
+    """
+    Collect the batches of table data produced on a port into a single
+    value. This is what a consumer receives when the pipeline is not
+    streaming, since an iterator can only be read once, by a single consumer,
+    and cannot be stored in a cache.
+
+    Parameters
+    ----------
+    data : Union[pd.DataFrame, Iterator[pd.DataFrame]]
+        The data produced on a table port.
+
+    Returns
+    -------
+    object
+        The data itself if it is not an iterator. Otherwise the batches
+        concatenated into one DataFrame with a fresh index (an empty one if
+        there were no batches), or the list of batches if they are not all
+        DataFrames.
+    """
+    if not isinstance(data, abc.Iterator):
+        return data
+    batches = list(data)
+    if not batches:
+        return pd.DataFrame()
+    if all(isinstance(batch, pd.DataFrame) for batch in batches):
+        return pd.concat(batches, ignore_index=True)
+    return batches
+
+
 class NodeType(Enum):
     """
     Defines the different node types that are available for Python based nodes.
@@ -112,6 +177,20 @@ class NodeType(Enum):
     """A node that doesn't fit one of the other node types."""
 
 
+class BatchMode(Enum):
+    """
+    Defines how a node is called when a pipeline streams batches of table data
+    through the graph.
+    """
+
+    ROW = "Row"
+    """The node is called once per batch, with one batch of each input."""
+    BLOCKING = "Blocking"
+    """The node needs its complete inputs and is called once with all batches combined."""
+    STREAM = "Stream"
+    """The node is called once with an iterator of batches for each input."""
+
+
 class Connection:
     pass
 
@@ -121,6 +200,7 @@ class Node(ABC):
     input_ports: List[Port]
     output_ports: List[Port]
     connections: List[Connection]
+    batch_mode: BatchMode = BatchMode.ROW
 
     def __init__(self, name: str, config: dict = None):
         self.name = name
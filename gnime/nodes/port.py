@@ -28,3 +28,5 @@ class Port:
         None  # can be used by BINARY and CONNECTION ports to only allow linking ports with matching IDs
     )
     optional: Optional[bool] = False
+    retain: Optional[bool] = False  # keep output data after all consumers have read it
+    serializer: Optional[object] = None  # gnime.serialization.Serializer for the port's data
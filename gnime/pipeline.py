@@ -1,26 +1,132 @@
 from multiprocessing.pool import ThreadPool
+from multiprocessing import Pool
+from contextlib import contextmanager
 from typing import List, Generator
+import itertools
+import asyncio
+import copy
+import json
+import heapq
+import queue
+import time
 import networkx as nx
 import diskcache
 import logging
+import psutil
 
-from .exceptions import InvalidStageTypeException, DAGVerificationException
+from .exceptions import (
+    InvalidStageTypeException, DAGVerificationException,
+    InvalidExecutorTypeException)
 from .serialization import CloudPickleSerializer
-from .stage import StageExecutor, Stage
-from .cache import DiskCache
+from .stage import (
+    StageExecutor, Stage, RUN_STATE_TAG, IN_PROGRESS_COUNT, DONE_COUNT,
+    in_progress_key, done_key)
+from .cache import DiskCache, MemoryCache, estimate_size
+from .profiling import RunReport
+from .hashing import hash_bytes, hash_config, hash_source
+from . import plan
+from .streaming import StreamExecutor
+
+
+EXECUTORS = {
+    'thread': ThreadPool,
+    'process': Pool,
+}
+
+# Weight of the latest run in the recorded stage durations, which are an
+# exponential moving average over runs. The same weight is used for the
+# recorded memory footprints.
+DURATION_SMOOTHING = 0.5
+
+
+def _execute_serialized_stage(serialized_stage: bytes) -> None:
+    """
+    Entry point of a process pool worker. The stage arrives serialized with
+    cloudpickle so that user-defined stages (including ones defined in
+    __main__) can be shipped to the worker. Port data is exchanged with other
+    workers through the disk cache shared by all stages.
+    """
+    stage = CloudPickleSerializer().deserialize(serialized_stage)
+    with StageExecutor(stage.disk_cache, [stage.name],
+                       namespace=stage.namespace) as stage_executor:
+        stage_executor.execute(stage.execute)
 
 
 class Pipeline(CloudPickleSerializer, DiskCache):
 
-    pipeline = nx.DiGraph()
+    def __init__(self, disk_cache=diskcache.Cache(), namespace: str = None):
+        """
+        Every pipeline has its own DAG. Its keys in the disk cache (the
+        pipeline snapshot, run state, profiles, recorded durations and the
+        port data of its stages) are prefixed with the namespace, e.g. a run
+        ID, so that pipelines with different namespaces can run concurrently
+        against one cache directory. Resuming a run, or an incremental run,
+        requires the namespace of the previous run.
 
-    def __init__(self, disk_cache=diskcache.Cache()):
+        Args:
+            disk_cache <diskcache.Cache>: The cache shared by the stages.
+            namespace [<str>, <None>]: Prefix of the pipeline's keys.
         """
-        We use database number 1 from Redis for the Pipeline's underlying Redis
-        cache.
+
+        DiskCache.__init__(self, disk_cache, namespace)
+
+        self.pipeline = nx.DiGraph()
+
+        self.memory_cache = MemoryCache()
+        self.run_report = None
+        self._refcounts = {}
+        self._consumed_ports = {}
+        self._pool = None
+        self._pool_spec = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @staticmethod
+    def _check_executor(executor: str) -> None:
+        if executor not in EXECUTORS:
+            raise InvalidExecutorTypeException(
+                'Please ensure executor is one of: %s' % ', '.join(EXECUTORS))
+
+    def get_pool(self, num_cores: int, executor: str = 'thread'):
         """
+        Method to obtain the worker pool owned by the pipeline. The pool is
+        created on first use and reused across repeated calls to start. It is
+        only replaced if a different number of cores or executor type is
+        requested.
 
-        DiskCache.__init__(self, disk_cache)
+        Args:
+            num_cores <int>: Number of workers in the pool.
+            executor <str>: Type of worker pool, either 'thread' or 'process'.
+
+        Returns:
+            multiprocessing.pool.Pool: The pipeline's worker pool.
+        """
+
+        self._check_executor(executor)
+
+        if self._pool_spec != (num_cores, executor):
+            self.close()
+            logging.info('Creating %s pool with %s workers', executor, num_cores)
+            self._pool = EXECUTORS[executor](num_cores)
+            self._pool_spec = (num_cores, executor)
+        return self._pool
+
+    def close(self) -> None:
+        """
+        Method to shut down the pipeline's worker pool, if any, waiting for
+        the workers to exit. The pipeline can still be started afterwards, in
+        which case a new pool is created.
+        """
+
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+        self._pool = None
+        self._pool_spec = None
 
     def topological_sort_grouped(self) -> Generator:
         """
@@ -63,6 +169,9 @@ class Pipeline(CloudPickleSerializer, DiskCache):
         Additionally, we add edges in the DAG between a stage and its preceding
         stages (as defined by the user).
 
+        Stages using the disk cache take the pipeline's namespace, so a stage
+        instance should only be added to one pipeline.
+
         Lastly, a check is done to ensure that after adding the stage, the DAG
         is still indeed a DAG.
         """
@@ -71,6 +180,9 @@ class Pipeline(CloudPickleSerializer, DiskCache):
             raise InvalidStageTypeException(
                 'Please ensure your stage is a subclass of pydags.stage.Stage')
 
+        if isinstance(stage, DiskCache):
+            stage.namespace = self.namespace
+
         self.pipeline.add_node(stage.name, stage_wrapper=stage)
 
         for preceding_stage in stage.preceding_stages:
@@ -109,32 +221,840 @@ class Pipeline(CloudPickleSerializer, DiskCache):
         """
         self.pipeline.nodes[stage_name]['stage_wrapper'].execute()
 
-    def start(self, num_cores: int = None) -> None:
+    def _count_consumers(self) -> None:
         """
-        Method to execute the pipeline (and all its constituent stages). The
-        order of execution is defined by the grouped topological sort. The
-        stages within a group will be executed in parallel (across cores) if
-        num_cores is a positive integer. If num_cores remains None (as per
-        default), then the entire pipeline (including stages within the same
-        group) will run serially.
+        Method to count, for every output port in the pipeline, the number of
+        downstream stages with an input port of the same name. Ports that are
+        retained, or that no stage consumes (i.e. the pipeline's results), are
+        not counted and therefore never evicted.
+        """
+
+        self._refcounts = {}
+        self._consumed_ports = {}
+        for producer in self.pipeline.nodes:
+            stage = self.pipeline.nodes[producer]['stage_wrapper']
+            for port in getattr(stage, 'output_ports', []):
+                if port.retain:
+                    continue
+                consumers = [
+                    consumer for consumer in nx.descendants(self.pipeline, producer)
+                    if port.name in [
+                        p.name for p in getattr(
+                            self.pipeline.nodes[consumer]['stage_wrapper'],
+                            'input_ports', [])]
+                ]
+                if not consumers:
+                    continue
+                self._refcounts[(producer, port.name)] = len(consumers)
+                for consumer in consumers:
+                    self._consumed_ports.setdefault(consumer, []).append(
+                        (producer, port))
+
+    def _release_inputs(self, stage_name: str) -> None:
+        """
+        Method to be called once a stage has finished. The reference count of
+        every port it consumed is decremented, and the data of ports whose
+        last consumer has now finished is deleted from the caches.
 
         Args:
-            num_cores [<int>, <None>]: Number of cores to distribute across.
+            stage_name <str>: Name of the stage that has finished.
+        """
+
+        for producer, port in self._consumed_ports.pop(stage_name, []):
+            self._refcounts[(producer, port.name)] -= 1
+            if not self._refcounts[(producer, port.name)]:
+                logging.info('Evicting port data: %s', port.name)
+                del self._refcounts[(producer, port.name)]
+                stage = self.pipeline.nodes[producer]['stage_wrapper']
+                stage.delete_port(port)
+
+    def _prune_missing(self, skipped: set) -> set:
+        """
+        Method to restrict a set of stages to skip to those whose stored data
+        is present for every output port still needed by a stage that will
+        run. A stage whose data is missing is scheduled again, which in turn
+        may require its own inputs, so this is repeated until stable.
+
+        Args:
+            skipped <set>: Names of the candidate stages to skip.
+
+        Returns:
+            set: Names of the stages to skip.
+        """
+
+        skipped = set(skipped) & set(self.pipeline.nodes)
+
+        changed = True
+        while changed:
+            changed = False
+            for consumer in set(self.pipeline.nodes) - skipped:
+                for producer, port in self._consumed_ports.get(consumer, []):
+                    stage = self.pipeline.nodes[producer]['stage_wrapper']
+                    if producer in skipped and not stage.has_port(port):
+                        logging.info(
+                            'Output %s of %s is missing, rerunning the stage',
+                            port.name, producer)
+                        skipped.discard(producer)
+                        changed = True
+        return skipped
+
+    def snapshot(self) -> dict:
+        """
+        Method to describe the structure of the pipeline: the type and a hash
+        of the config of every stage, and the edges between stages. Unlike
+        the graph itself, the description holds no stage instances, so it is
+        cheap to build, compare and store.
+
+        Returns:
+            dict: The stages (name to type and config hash) and the edges.
+        """
+        stages = {}
+        for stage_name in self.pipeline.nodes:
+            stage = self.pipeline.nodes[stage_name]['stage_wrapper']
+            stages[stage_name] = {
+                'type': '%s.%s' % (type(stage).__module__, type(stage).__qualname__),
+                'config': hash_config(getattr(stage, 'config', None)),
+            }
+        return {
+            'stages': stages,
+            'edges': sorted(self.pipeline.edges),
+        }
+
+    def _write_snapshot(self) -> None:
+        """
+        Method to store the snapshot of the pipeline in the cache under
+        'pipeline', together with its digest under 'pipeline_digest'. The
+        snapshot is only rewritten when its digest differs from the stored
+        one, so starting an unchanged pipeline costs a single small read.
+        """
+        snapshot = json.dumps(self.snapshot(), sort_keys=True)
+        digest = hash_bytes(snapshot.encode())
+        if self.read('pipeline_digest') == digest:
+            return
+
+        logging.info('Writing pipeline snapshot to the cache')
+        with self.disk_cache.transact():
+            self.write('pipeline', snapshot)
+            self.write('pipeline_digest', digest)
+
+    def stored_snapshot(self) -> dict:
+        """
+        Method to load the snapshot of the pipeline stored by the last run
+        (see snapshot), or None if there is none.
+        """
+        snapshot = self.read('pipeline')
+        return json.loads(snapshot) if snapshot is not None else None
+
+    def _resumable_stages(self) -> set:
+        """
+        Method to determine which stages a resumed run can skip. These are the
+        stages recorded as done by the previous run whose outputs are still
+        available.
+
+        Returns:
+            set: Names of the stages to skip.
+        """
+
+        done = [
+            stage_name for stage_name in self.pipeline.nodes
+            if self.exists(done_key(stage_name))
+        ]
+        skipped = self._prune_missing(done)
+
+        # Stages that were interrupted, or whose outputs are gone, run again,
+        # so only the skipped stages stay marked as done.
+        with self.disk_cache.transact():
+            for stage_name in self.pipeline.nodes:
+                self.delete(in_progress_key(stage_name))
+                if stage_name not in skipped:
+                    self.delete(done_key(stage_name))
+            self.disk_cache.set(self.key(IN_PROGRESS_COUNT), 0)
+            self.disk_cache.set(self.key(DONE_COUNT), len(skipped))
+        return skipped
+
+    def _clear_run_state(self) -> None:
+        """
+        Method to delete the run state (stages in progress and done) recorded
+        by the StageExecutors of the previous run.
+        """
+        self.disk_cache.evict(self.key(RUN_STATE_TAG))
+        self.delete(IN_PROGRESS_COUNT)
+        self.delete(DONE_COUNT)
+
+    def progress(self) -> dict:
+        """
+        Method to obtain the number of stages in progress and done in the
+        current run. The counters are kept in the disk cache, so the progress
+        of a run can also be polled from another process sharing the cache.
+
+        Returns:
+            dict: The number of stages 'in_progress' and 'done'.
+        """
+        return {
+            'in_progress': self.disk_cache.get(self.key(IN_PROGRESS_COUNT), 0),
+            'done': self.disk_cache.get(self.key(DONE_COUNT), 0),
+        }
+
+    def fingerprints(self, external: bool = True) -> dict:
+        """
+        Method to compute the fingerprint of every stage of the pipeline: a
+        hash of the code and of the config of the stage, and the fingerprint
+        of the external data it reads. Computing the latter can be costly
+        (e.g. hashing the content of the files read), so it can be left out.
+
+        Args:
+            external <bool>: Whether to compute the fingerprints of external
+                data, which are None otherwise.
+
+        Returns:
+            dict: Map of stage name to a dict with the 'code', 'config' and
+                'data' fingerprints of the stage ('data' being None for
+                stages that do not read external data).
+        """
+        fingerprints = {}
+        for stage_name in self.pipeline.nodes:
+            stage = self.pipeline.nodes[stage_name]['stage_wrapper']
+            fingerprints[stage_name] = {
+                'code': hash_source(getattr(stage, 'implementation', type(stage))),
+                'config': hash_config(getattr(stage, 'config', None)),
+                'data': stage.fingerprint() if external else None,
+            }
+        return fingerprints
+
+    def _unchanged_stages(self, fingerprints: dict) -> set:
+        """
+        Method to determine which stages an incremental run can skip. Stages
+        whose fingerprint differs from the one recorded by the previous
+        successful run (or that did not exist then) are invalidated together
+        with every stage reachable from them. Source stages that do not
+        fingerprint the data they read are always invalidated, since nothing
+        tells whether their data changed. The others are skipped, as long as
+        their outputs are still available.
+
+        Args:
+            fingerprints <dict>: Fingerprints of the stages for this run.
+
+        Returns:
+            set: Names of the stages to skip.
+        """
+
+        previous = self.read('fingerprints')
+        if previous is None:
+            return set()
+        previous = self.deserialize(previous)
+
+        changed = {
+            stage_name for stage_name, fingerprint in fingerprints.items()
+            if previous.get(stage_name) != fingerprint or (
+                fingerprint['data'] is None
+                and self.pipeline.in_degree(stage_name) == 0)
+        }
+        invalidated = set(changed)
+        for stage_name in changed:
+            invalidated |= nx.descendants(self.pipeline, stage_name)
+        logging.info('Stages invalidated by changes: %s', invalidated)
+
+        return self._prune_missing(set(self.pipeline.nodes) - invalidated)
+
+    def _collect_report(self, start: float, wall_time: float) -> RunReport:
+        """
+        Method to gather the profiles written to the cache by the stages that
+        ran, in topological order, into a report of the run. The profiles are
+        removed from the cache once collected.
+
+        Args:
+            start <float>: Wall-clock time at which the run started.
+            wall_time <float>: Elapsed time of the run.
+
+        Returns:
+            RunReport: The report of the run.
+        """
+
+        profiles = []
+        for stage_name in nx.topological_sort(self.pipeline):
+            serialized = self.read('profile:%s' % stage_name)
+            if serialized is not None:
+                profiles.append(self.deserialize(serialized))
+                self.delete('profile:%s' % stage_name)
+        return RunReport(start, wall_time, profiles)
+
+    def _spill(self, memory_budget: int = None) -> None:
+        """
+        Method to relieve memory pressure. When the resident set size of the
+        process exceeds memory_budget, port data held in the memory cache is
+        moved to the disk cache, oldest first, until the estimated size of
+        the spilled data covers the excess. Without a budget, all the port
+        data held in the memory cache is moved.
+
+        Args:
+            memory_budget [<int>, <None>]: Memory budget of the run in bytes.
+        """
+
+        if memory_budget is None:
+            excess = float('inf')
+        else:
+            excess = psutil.Process().memory_info().rss - memory_budget
+            if excess <= 0:
+                return
+
+        producers = {}
+        for stage_name in self.pipeline.nodes:
+            stage = self.pipeline.nodes[stage_name]['stage_wrapper']
+            for port in getattr(stage, 'output_ports', []):
+                producers.setdefault(port.name, (stage, port))
+
+        for port_name in self.memory_cache.keys():
+            if excess <= 0:
+                break
+            if port_name not in producers:
+                continue
+            stage, port = producers[port_name]
+            size = estimate_size(self.memory_cache.read(port_name))
+            logging.info('Spilling port data to the disk cache: %s', port_name)
+            stage.spill_port(port)
+            excess -= size
+
+    def _execute_stage(self, stage_name: str) -> None:
+        """
+        Method to run a single stage inside a StageExecutor so that its
+        progress is recorded in the cache. This is the unit of work handed to
+        the worker pool by the scheduler.
+
+        Args:
+            stage_name <str>: Name of the stage in the pipeline.
+        """
+        with StageExecutor(self.disk_cache, [stage_name],
+                           namespace=self.namespace) as stage_executor:
+            stage_executor.execute(self.run_stage, stage_name)
+
+    def _submit_stage(self, pool, executor: str, stage_name: str, **kwargs):
+        """
+        Method to submit a single stage to the worker pool. Thread workers
+        share the pipeline with the scheduler and run the stage by name, while
+        process workers receive the serialized stage.
+
+        The stage is shipped without its preceding stages, which would
+        otherwise pull the whole upstream graph into the payload. The worker
+        does not need them, since dependencies are resolved by the scheduler.
+        """
+        if executor == 'process':
+            stage = copy.copy(self.pipeline.nodes[stage_name]['stage_wrapper'])
+            stage.preceding_stages = []
+            return pool.apply_async(
+                _execute_serialized_stage, (self.serialize(stage),), **kwargs)
+        return pool.apply_async(self._execute_stage, (stage_name,), **kwargs)
+
+    def _schedule(self, pool, num_workers: int, executor: str,
+                  skipped: set = frozenset(), memory_budget: int = None) -> None:
+        """
+        Method to run the pipeline on a worker pool using a ready queue. A
+        stage is submitted as soon as all of its preceding stages have
+        finished, rather than waiting for the whole topological group it
+        belongs to. At most num_workers stages are in flight at any time.
+
+        When more stages are ready than workers are free, the stages with the
+        longest remaining path to the end of the pipeline (estimated from the
+        durations recorded by previous runs) are started first, so that long
+        chains are not left to run on their own at the end.
+
+        With a memory budget, a ready stage is only admitted while the
+        estimated memory of the running stages plus its own stays within the
+        budget, taking the highest priority stage that fits. A stage is
+        always admitted when nothing else is running, so that a stage larger
+        than the budget still runs, on its own. Whenever a stage finishes,
+        data held in the memory cache is spilled to the disk cache if the
+        process is over budget.
+
+        If a stage raises, no further stages are submitted and the exception
+        is re-raised once the stages already in flight have finished, so the
+        pool is left idle for the next run.
+
+        Args:
+            pool <multiprocessing.pool.Pool>: Pool to submit stages to.
+            num_workers <int>: Maximum number of stages running concurrently.
+            executor <str>: Type of pool, either 'thread' or 'process'.
+            skipped <set>: Names of stages to treat as already completed.
+            memory_budget [<int>, <None>]: Memory budget in bytes, if any.
         """
 
-        logging.info('Serializing pipeline and writing to Redis')
-        self.write('pipeline', self.serialize(self.pipeline))
+        completed = queue.Queue()
+        priorities = plan.upward_ranks(self.pipeline, self.estimated_durations())
+        order = itertools.count()
+        remaining = {
+            v: len([u for u in self.pipeline.predecessors(v) if u not in skipped])
+            for v in self.pipeline.nodes if v not in skipped
+        }
+        ready = [(-priorities[v], next(order), v) for v, d in remaining.items() if d == 0]
+        heapq.heapify(ready)
+        memory = self.estimated_memory() if memory_budget is not None else {}
+        memory_in_use = 0
+        running = 0
+        failure = None
+
+        while ready or running:
+            while ready and running < num_workers and failure is None:
+                if memory_budget is None or not running:
+                    _, _, stage = heapq.heappop(ready)
+                else:
+                    fitting = [
+                        entry for entry in sorted(ready)
+                        if memory_in_use + memory[entry[2]] <= memory_budget
+                    ]
+                    if not fitting:
+                        break
+                    ready.remove(fitting[0])
+                    heapq.heapify(ready)
+                    stage = fitting[0][2]
+                logging.info('Submitting stage: %s', stage)
+                self._submit_stage(
+                    pool, executor, stage,
+                    callback=lambda _, s=stage: completed.put((s, None)),
+                    error_callback=lambda e, s=stage: completed.put((s, e)))
+                memory_in_use += memory.get(stage, 0)
+                running += 1
+
+            stage, error = completed.get()
+            memory_in_use -= memory.get(stage, 0)
+            running -= 1
+            if error is not None:
+                failure = failure or error
+            if failure is not None:
+                ready = []
+                continue
+
+            self._release_inputs(stage)
+            if memory_budget is not None:
+                self._spill(memory_budget)
+            for _, child in self.pipeline.edges(stage):
+                remaining[child] -= 1
+                if not remaining[child]:
+                    heapq.heappush(ready, (-priorities[child], next(order), child))
+
+        if failure is not None:
+            raise failure
+
+    async def _execute_stage_async(self, stage_name: str) -> None:
+        """
+        Method to run a single stage on the event loop inside a StageExecutor.
+        Stages providing execute_async (i.e. node stages) are awaited, while
+        other stages are offloaded to the loop's default executor.
+
+        Args:
+            stage_name <str>: Name of the stage in the pipeline.
+        """
+        stage = self.pipeline.nodes[stage_name]['stage_wrapper']
+        with StageExecutor(self.disk_cache, [stage_name], namespace=self.namespace):
+            if hasattr(stage, 'execute_async'):
+                await stage.execute_async()
+            else:
+                await asyncio.to_thread(stage.execute)
+
+    async def _schedule_async(self, max_concurrency: int,
+                              skipped: set = frozenset()) -> None:
+        """
+        Method to run the pipeline as asyncio tasks, one per stage. Each task
+        waits for the tasks of its preceding stages and then for a slot of a
+        semaphore bounding the number of stages running concurrently. Tasks
+        are created in topological order, so the preceding tasks of a stage
+        always exist when it is created.
+
+        If a stage raises, the tasks that have not finished are cancelled and
+        the exception is re-raised.
+
+        Args:
+            max_concurrency <int>: Maximum number of stages running concurrently.
+            skipped <set>: Names of stages to treat as already completed.
+        """
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+        tasks = {}
+
+        async def run(stage_name: str, preceding: list) -> None:
+            await asyncio.gather(*preceding)
+            async with semaphore:
+                logging.info('Starting stage: %s', stage_name)
+                await self._execute_stage_async(stage_name)
+            self._release_inputs(stage_name)
+
+        for stage_name in nx.topological_sort(self.pipeline):
+            if stage_name in skipped:
+                continue
+            preceding = [
+                tasks[p] for p in self.pipeline.predecessors(stage_name)
+                if p not in skipped
+            ]
+            tasks[stage_name] = asyncio.create_task(
+                run(stage_name, preceding), name='gnime-%s' % stage_name)
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+    def _attach_memory_cache(self, memory_cache: MemoryCache) -> None:
+        """
+        Method to hand the in-process cache to every stage that supports
+        in-memory data handoff (or to detach it by passing None).
+        """
+        for stage_name in self.pipeline.nodes:
+            stage = self.pipeline.nodes[stage_name]['stage_wrapper']
+            if hasattr(stage, 'memory_cache'):
+                stage.memory_cache = memory_cache
 
-        sorted_grouped_stages = self.topological_sort_grouped()
-        for group in sorted_grouped_stages:
-            logging.info('Processing group: %s', group)
+    @contextmanager
+    def _run(self, in_memory: bool, resume: bool, incremental: bool):
+        """
+        Method wrapping a run of the pipeline on any engine. Before the run,
+        the pipeline's snapshot is updated, the consumers of every port are
+        counted, and the stages to skip are determined. After the run, the
+        report is collected and, if no stage raised, the fingerprints and
+        durations of the run are recorded.
+
+        Args:
+            in_memory <bool>: Whether to pass port data through the memory cache.
+            resume <bool>: Whether to skip the stages completed by the last run.
+            incremental <bool>: Whether to only rerun stages affected by
+                changed inputs, code or config since the last successful run.
+
+        Yields:
+            set: Names of the stages to skip.
+        """
+
+        self._write_snapshot()
+
+        self.memory_cache.clear()
+        run_start = time.time()
+        tick = time.perf_counter()
+        for stage_name in self.pipeline.nodes:
+            self.delete('profile:%s' % stage_name)
+
+        self._count_consumers()
+        # External data is only fingerprinted by incremental runs. The other
+        # runs record None, so that the next incremental run reruns the
+        # sources rather than trusting outputs computed from other data.
+        fingerprints = self.fingerprints(external=incremental)
+        if resume:
+            skipped = self._resumable_stages()
+            logging.info('Resuming pipeline, skipping stages: %s', skipped)
+            for stage in skipped:
+                self._release_inputs(stage)
+        else:
+            skipped = set()
+            self._clear_run_state()
+        if incremental:
+            skipped |= self._unchanged_stages(fingerprints)
+            logging.info('Incremental run, skipping stages: %s', skipped)
+            self._refcounts = {}
+            self._consumed_ports = {}
+        # The run overwrites port data, so the recorded fingerprints no longer
+        # describe it until the run succeeds and records its own.
+        self.delete('fingerprints')
+
+        self._attach_memory_cache(
+            self.memory_cache if in_memory and not incremental else None)
+
+        try:
+            yield skipped
+        except BaseException:
+            # Outputs handed over in memory are checkpointed to the disk cache,
+            # so that a resumed run can reuse the stages that completed.
+            try:
+                self._spill()
+            except Exception:
+                logging.exception('Could not checkpoint the memory cache')
+            raise
+        finally:
+            self._attach_memory_cache(None)
+            self.run_report = self._collect_report(
+                run_start, time.perf_counter() - tick)
+
+        self.write('fingerprints', self.serialize(fingerprints))
+        self._record_durations(self.run_report)
+        self._record_memory(self.run_report)
+        self._clear_run_state()
+
+    def start(self, num_cores: int = None, executor: str = 'thread',
+              in_memory: bool = True, resume: bool = False,
+              incremental: bool = False, memory_budget: int = None) -> None:
+        """
+        Method to execute the pipeline (and all its constituent stages). If
+        num_cores is a positive integer, stages are distributed across a pool
+        of num_cores workers and each stage starts as soon as its preceding
+        stages are done. If num_cores remains None (as per default), then the
+        entire pipeline will run serially in the order defined by the grouped
+        topological sort.
+
+        The 'thread' executor suits stages that release the GIL (mostly I/O),
+        whereas the 'process' executor runs each stage in a separate worker
+        process, which is what CPU-bound stages need to use several cores.
+        The pool is owned by the pipeline and reused across runs; use the
+        pipeline as a context manager, or call close, to shut it down.
+
+        When the whole pipeline runs in this process (serially or on the
+        'thread' executor) and in_memory is True, port data is passed between
+        stages by reference through the pipeline's memory cache. Stages with
+        persist set, and all stages on the 'process' executor, go through the
+        disk cache instead. The memory cache keeps the outputs of the last
+        run until the next one starts.
+
+        A memory budget bounds the memory the run may use: stages are only
+        started while the memory they are estimated to need (their
+        memory_estimate, or the footprint measured by previous runs) fits in
+        the budget, and data in the memory cache is spilled to the disk cache
+        when the process exceeds it.
+
+        When a stage raises, the outputs still held in the memory cache are
+        written to the disk cache before the exception propagates, so that
+        start(resume=True) can skip the stages that completed. A process that
+        is killed outright cannot do so: to resume from hard crashes, run
+        with in_memory=False (or persist set on the stages worth keeping).
+
+        An incremental run reruns the stages whose inputs, code or config
+        changed since the last successful run, and reuses the stored outputs
+        of the others. Those outputs must outlive the run, so an incremental
+        run neither hands data over in memory (in_memory is ignored) nor
+        evicts port data once consumed. After a run that failed, or a
+        streamed run, the next incremental run reruns every stage; after a
+        successful run that was not incremental, it reruns the source stages
+        and everything that depends on them.
+
+        Args:
+            num_cores [<int>, <None>]: Number of cores to distribute across.
+            executor <str>: Type of worker pool, either 'thread' or 'process'.
+            in_memory <bool>: Whether to pass port data in memory when possible.
+            resume <bool>: Whether to skip the stages completed by the last run.
+            incremental <bool>: Whether to only rerun stages affected by
+                changed inputs, code or config since the last successful run.
+            memory_budget [<int>, <None>]: Memory budget of the run in bytes.
+        """
+
+        self._check_executor(executor)
+        single_process = not num_cores or executor != 'process'
+        with self._run(in_memory and single_process, resume, incremental) as skipped:
             if num_cores:
-                pool = ThreadPool(num_cores)
-                with StageExecutor(self.disk_cache, group) as stage_executor:
-                    stage_executor.execute(pool.map, self.run_stage, group)
+                pool = self.get_pool(num_cores, executor)
+                self._schedule(pool, num_cores, executor, skipped, memory_budget)
+            else:
+                for group in self.topological_sort_grouped():
+                    logging.info('Processing group: %s', group)
+                    for stage in group:
+                        if stage in skipped:
+                            continue
+                        self._execute_stage(stage)
+                        self._release_inputs(stage)
+                        if memory_budget is not None:
+                            self._spill(memory_budget)
+
+    async def start_async(self, max_concurrency: int = 100, in_memory: bool = True,
+                          resume: bool = False, incremental: bool = False) -> None:
+        """
+        Method to execute the pipeline on the running asyncio event loop. Every
+        stage becomes a task that starts as soon as its preceding stages are
+        done, with at most max_concurrency stages running at once. Node
+        stages whose run method is an async def are awaited on the loop, so
+        many stages waiting on I/O cost a task each rather than a thread.
+        Sync stages are offloaded to the loop's default executor.
+
+        Port data is handed over as in a single-process start, and resume and
+        incremental have the same meaning. Call it with
+        asyncio.run(pipeline.start_async()) from synchronous code.
+
+        Args:
+            max_concurrency <int>: Maximum number of stages running concurrently.
+            in_memory <bool>: Whether to pass port data in memory when possible.
+            resume <bool>: Whether to skip the stages completed by the last run.
+            incremental <bool>: Whether to only rerun stages affected by
+                changed inputs, code or config since the last successful run.
+        """
+
+        with self._run(in_memory, resume, incremental) as skipped:
+            await self._schedule_async(max_concurrency, skipped)
+
+    def stream(self, queue_size: int = 8) -> None:
+        """
+        Method to execute the pipeline in streaming mode. Rather than running
+        each stage once on its complete inputs, batches of data flow through
+        the connected ports while all stages run concurrently, with at most
+        queue_size batches waiting between two stages. Stages are called
+        according to their batch_mode (see gnime.streaming.StreamExecutor), so
+        a chunked source, row-wise transforms and a streaming sink run in
+        memory bounded by the batch and queue sizes.
+
+        Args:
+            queue_size <int>: Maximum number of batches waiting on each edge.
+        """
+
+        logging.info('Streaming pipeline with queues of %s batches', queue_size)
+        run_start = time.time()
+        tick = time.perf_counter()
+        self._clear_run_state()
+        self.delete('fingerprints')
+        try:
+            StreamExecutor(
+                self.pipeline, self.disk_cache, queue_size, self.namespace).execute()
+        finally:
+            self.run_report = self._collect_report(
+                run_start, time.perf_counter() - tick)
+        self._clear_run_state()
+
+    def _record_durations(self, report: RunReport) -> None:
+        """
+        Method to persist the durations of the stages executed in a run. The
+        recorded duration of a stage is an exponential moving average over the
+        runs that executed it, so that a single unusual run does not upset the
+        scheduling of the following ones. Stages that were skipped keep their
+        previously recorded duration.
+        """
+        durations = self.durations()
+        for profile in report.profiles:
+            previous = durations.get(profile.stage, profile.wall_time)
+            durations[profile.stage] = \
+                DURATION_SMOOTHING * profile.wall_time \
+                + (1 - DURATION_SMOOTHING) * previous
+        self.write('durations', self.serialize(durations))
+
+    def _record_memory(self, report: RunReport) -> None:
+        """
+        Method to persist the memory footprints of the stages executed in a
+        run, as an exponential moving average over runs like the durations.
+        """
+        footprints = self.memory_footprints()
+        for profile in report.profiles:
+            previous = footprints.get(profile.stage, profile.memory_footprint)
+            footprints[profile.stage] = int(
+                DURATION_SMOOTHING * profile.memory_footprint
+                + (1 - DURATION_SMOOTHING) * previous)
+        self.write('memory', self.serialize(footprints))
+
+    def memory_footprints(self) -> dict:
+        """
+        Method to obtain the memory footprint of each stage recorded by
+        previous runs, i.e. the growth of the resident set size of the process
+        while the stage ran (a moving average over the runs that executed it).
+        Stages running concurrently in one process share the measurement, so
+        footprints are approximate.
+
+        Returns:
+            dict: Map of stage name to memory footprint in bytes.
+        """
+        footprints = self.read('memory')
+        return self.deserialize(footprints) if footprints is not None else {}
+
+    def estimated_memory(self) -> dict:
+        """
+        Method to estimate the memory each stage needs while it runs. A stage's
+        memory_estimate takes precedence over the footprint recorded by
+        previous runs, and stages with neither are assumed to need the average
+        recorded footprint (or nothing if nothing was recorded yet).
+
+        Returns:
+            dict: Map of stage name to estimated memory in bytes.
+        """
+        footprints = self.memory_footprints()
+        known = [footprints[s] for s in self.pipeline.nodes if s in footprints]
+        default = sum(known) // len(known) if known else 0
+        estimates = {}
+        for stage_name in self.pipeline.nodes:
+            stage = self.pipeline.nodes[stage_name]['stage_wrapper']
+            if stage.memory_estimate is not None:
+                estimates[stage_name] = stage.memory_estimate
             else:
-                for stage in group:
-                    with StageExecutor(self.disk_cache, [stage]) as stage_executor:
-                        stage_executor.execute(self.run_stage, stage)
+                estimates[stage_name] = footprints.get(stage_name, default)
+        return estimates
+
+    def estimated_durations(self) -> dict:
+        """
+        Method to estimate the duration of every stage from previous runs.
+        Stages without history are assumed to take the average recorded
+        duration (or 0 if nothing was recorded yet).
+
+        Returns:
+            dict: Map of stage name to estimated duration in seconds.
+        """
+        durations = self.durations()
+        known = [durations[s] for s in self.pipeline.nodes if s in durations]
+        default = sum(known) / len(known) if known else 0.0
+        return {s: durations.get(s, default) for s in self.pipeline.nodes}
+
+    def durations(self) -> dict:
+        """
+        Method to obtain the duration of each stage recorded by previous runs
+        (a moving average over the runs that executed it).
+
+        Returns:
+            dict: Map of stage name to duration in seconds.
+        """
+        durations = self.read('durations')
+        return self.deserialize(durations) if durations is not None else {}
+
+    def critical_path(self, durations: dict = None) -> tuple:
+        """
+        Method to compute the critical path of the pipeline, i.e. the chain of
+        dependent stages with the largest total duration.
+
+        Args:
+            durations [<dict>, <None>]: Stage durations, defaulting to those
+                recorded by previous runs.
+
+        Returns:
+            tuple: The stages on the critical path and its length in seconds.
+        """
+        if durations is None:
+            durations = self.durations()
+        return plan.critical_path(self.pipeline, durations)
+
+    def estimate_makespan(self, num_workers: int, durations: dict = None) -> float:
+        """
+        Method to estimate the time needed to run the pipeline on num_workers
+        workers, by simulating the scheduler with the stage durations.
+
+        Args:
+            num_workers <int>: Number of workers.
+            durations [<dict>, <None>]: Stage durations, defaulting to those
+                recorded by previous runs.
+
+        Returns:
+            float: Estimated makespan in seconds.
+        """
+        if durations is None:
+            durations = self.durations()
+        return plan.estimate_makespan(self.pipeline, durations, num_workers)
+
+    def execution_plan(self, max_workers: int = None,
+                       durations: dict = None) -> plan.ExecutionPlan:
+        """
+        Method to build the execution plan report of the pipeline: critical
+        path, number of stages per level of the grouped topological sort, and
+        estimated makespan for 1 to max_workers workers (by default, up to
+        the width of the widest level).
+
+        Args:
+            max_workers [<int>, <None>]: Largest number of workers to estimate.
+            durations [<dict>, <None>]: Stage durations, defaulting to those
+                recorded by previous runs.
+
+        Returns:
+            ExecutionPlan: The execution plan report.
+        """
+        if durations is None:
+            durations = self.durations()
+        durations = {s: durations.get(s, 0.0) for s in self.pipeline.nodes}
+
+        path, length = self.critical_path(durations)
+        level_widths = [len(group) for group in self.topological_sort_grouped()]
+        max_workers = max_workers or max(level_widths, default=1)
 
-        self.delete('done')
+        return plan.ExecutionPlan(
+            critical_path=path,
+            critical_path_length=length,
+            total_work=sum(durations.values()),
+            level_widths=level_widths,
+            makespans={
+                n: self.estimate_makespan(n, durations)
+                for n in range(1, max_workers + 1)
+            },
+            durations=durations,
+        )
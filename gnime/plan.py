@@ -0,0 +1,182 @@
+"""
+Analysis of the execution plan of a pipeline from the stage durations of a
+previous run: critical path, parallelism per level and estimated makespan for
+a number of workers.
+
+The report can also be printed from the command line, given the pipeline as
+a module attribute, either a Pipeline instance or a function returning one:
+
+    python -m gnime.plan my_module:build_pipeline --workers 8
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+import itertools
+import importlib
+import argparse
+import heapq
+import json
+import sys
+import os
+
+import networkx as nx
+
+
+def upward_ranks(pipeline: nx.DiGraph, durations: Dict[str, float]) -> Dict[str, float]:
+    """
+    Return, for every stage, the length of the longest path from the start of
+    the stage to the end of the pipeline, the stage itself included.
+    """
+    ranks = {}
+    for stage in reversed(list(nx.topological_sort(pipeline))):
+        ranks[stage] = durations.get(stage, 0.0) + max(
+            [ranks[child] for child in pipeline.successors(stage)], default=0.0)
+    return ranks
+
+
+def critical_path(pipeline: nx.DiGraph, durations: Dict[str, float]) -> Tuple[List[str], float]:
+    """
+    Return the critical path of the pipeline, i.e. the chain of dependent
+    stages with the largest total duration, and its length. No schedule can
+    finish faster than the critical path, whatever the number of workers.
+    """
+    ranks = upward_ranks(pipeline, durations)
+    if not ranks:
+        return [], 0.0
+
+    path = []
+    candidates = [s for s in pipeline.nodes if pipeline.in_degree(s) == 0]
+    while candidates:
+        stage = max(candidates, key=lambda s: ranks[s])
+        path.append(stage)
+        candidates = list(pipeline.successors(stage))
+    return path, ranks[path[0]]
+
+
+def estimate_makespan(pipeline: nx.DiGraph, durations: Dict[str, float], num_workers: int) -> float:
+    """
+    Estimate the time to run the pipeline on num_workers workers by simulating
+    the pipeline's scheduler: a stage becomes ready once all of its preceding
+    stages have finished, and whenever a worker is free the ready stage with
+    the longest remaining path is started.
+    """
+    ranks = upward_ranks(pipeline, durations)
+    order = itertools.count()
+    remaining = {s: pipeline.in_degree(s) for s in pipeline.nodes}
+    ready = [(-ranks[s], next(order), s) for s, d in remaining.items() if d == 0]
+    heapq.heapify(ready)
+    running = []
+    now = 0.0
+
+    while ready or running:
+        while ready and len(running) < num_workers:
+            _, _, stage = heapq.heappop(ready)
+            heapq.heappush(running, (now + durations.get(stage, 0.0), stage))
+        now, stage = heapq.heappop(running)
+        for child in pipeline.successors(stage):
+            remaining[child] -= 1
+            if not remaining[child]:
+                heapq.heappush(ready, (-ranks[child], next(order), child))
+    return now
+
+
+@dataclass
+class ExecutionPlan:
+    """
+    Report of the execution plan of a pipeline.
+
+    critical_path: Stages on the critical path, in execution order.
+    critical_path_length: Total duration of the critical path.
+    total_work: Sum of the durations of all stages.
+    level_widths: Number of stages in each level of the grouped topological sort.
+    makespans: Estimated makespan for each number of workers.
+    durations: Duration used for each stage (stages without a recorded
+        duration count as 0).
+    """
+
+    critical_path: List[str]
+    critical_path_length: float
+    total_work: float
+    level_widths: List[int]
+    makespans: Dict[int, float] = field(default_factory=dict)
+    durations: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def average_parallelism(self) -> float:
+        """Total work divided by the critical path length."""
+        if not self.critical_path_length:
+            return 0.0
+        return self.total_work / self.critical_path_length
+
+    @property
+    def useful_workers(self) -> int:
+        """Smallest number of workers beyond which the estimated makespan stops improving."""
+        best = min(self.makespans.values(), default=0.0)
+        return min(
+            (n for n, makespan in self.makespans.items() if makespan <= best * 1.0001),
+            default=1)
+
+    def to_dict(self) -> dict:
+        return {
+            'critical_path': self.critical_path,
+            'critical_path_length': self.critical_path_length,
+            'total_work': self.total_work,
+            'average_parallelism': self.average_parallelism,
+            'level_widths': self.level_widths,
+            'makespans': self.makespans,
+            'useful_workers': self.useful_workers,
+            'durations': self.durations,
+        }
+
+    def format(self) -> str:
+        lines = [
+            'Critical path (%.3f s):' % self.critical_path_length,
+        ]
+        lines += [
+            '  %-40s %10.3f s' % (stage, self.durations.get(stage, 0.0))
+            for stage in self.critical_path
+        ]
+        lines += [
+            '',
+            'Total work:          %.3f s' % self.total_work,
+            'Average parallelism: %.2f' % self.average_parallelism,
+            'Stages per level:    %s' % ' '.join(str(w) for w in self.level_widths),
+            '',
+            '%8s %12s %9s' % ('workers', 'makespan', 'speedup'),
+        ]
+        serial = self.makespans.get(1, self.total_work)
+        for num_workers, makespan in sorted(self.makespans.items()):
+            lines.append('%8d %10.3f s %8.2fx' % (
+                num_workers, makespan, serial / makespan if makespan else 0.0))
+        lines += [
+            '',
+            'Adding workers beyond %d does not reduce the estimated makespan.'
+            % self.useful_workers,
+        ]
+        return '\n'.join(lines)
+
+
+def load_pipeline(spec: str):
+    """Load a pipeline given as 'module:attribute' (an instance or a factory)."""
+    module_name, _, attribute = spec.partition(':')
+    sys.path.insert(0, os.getcwd())
+    pipeline = getattr(importlib.import_module(module_name), attribute or 'pipeline')
+    return pipeline() if callable(pipeline) else pipeline
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog='python -m gnime.plan',
+        description='Critical-path and execution-plan report of a pipeline.')
+    parser.add_argument('pipeline', help="module:attribute of a Pipeline or a function returning one")
+    parser.add_argument('--workers', type=int, default=None,
+                        help='estimate makespans for 1 to this many workers '
+                             '(default: the width of the widest level)')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    plan = load_pipeline(args.pipeline).execution_plan(args.workers)
+    print(json.dumps(plan.to_dict(), indent=2) if args.json else plan.format())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+from dataclasses import dataclass, field, asdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+import threading
+import json
+import time
+import os
+
+import psutil
+
+
+RSS_SAMPLING_INTERVAL = 0.02
+
+# The profile of the stage being executed. A context variable rather than a
+# thread-local, so that stages running as asyncio tasks on one thread each see
+# their own profile, and work offloaded with asyncio.to_thread keeps it.
+_current_profile: ContextVar[Optional['StageProfile']] = ContextVar(
+    'gnime_current_profile', default=None)
+
+
+@dataclass
+class StageProfile:
+    """
+    Measurements taken while executing a single stage.
+
+    stage: Name of the stage.
+    pid: Process in which the stage ran.
+    thread: Thread in which the stage ran.
+    start: Wall-clock time (seconds since the epoch) at which the stage started.
+    wall_time: Elapsed time of the stage, including run-state bookkeeping.
+    cpu_time: CPU time used by the thread running the stage. For stages run
+        as asyncio tasks, this is the event loop thread, which is shared with
+        the other tasks.
+    peak_rss: Highest resident set size of the process observed while the
+        stage ran. Stages running concurrently in one process share it.
+    base_rss: Resident set size of the process when the stage started.
+    phases: Total wall time spent in each phase (e.g. pre_execute, run,
+        post_execute, cache_read, deserialize, serialize, cache_write).
+    spans: (phase, start, duration) of every phase, for trace exports.
+    bytes_read: Bytes read from the caches, per input port.
+    bytes_written: Bytes written to the caches, per output port.
+    """
+
+    stage: str
+    pid: int = field(default_factory=os.getpid)
+    thread: int = field(default_factory=threading.get_ident)
+    start: float = 0.0
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    peak_rss: int = 0
+    base_rss: int = 0
+    phases: Dict[str, float] = field(default_factory=dict)
+    spans: List[tuple] = field(default_factory=list)
+    bytes_read: Dict[str, int] = field(default_factory=dict)
+    bytes_written: Dict[str, int] = field(default_factory=dict)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.time()
+        tick = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - tick
+            self.phases[name] = self.phases.get(name, 0.0) + duration
+            self.spans.append((name, start, duration))
+
+    @property
+    def memory_footprint(self) -> int:
+        """Growth of the resident set size of the process while the stage ran."""
+        return max(self.peak_rss - self.base_rss, 0)
+
+
+class _RSSSampler(threading.Thread):
+    """
+    Samples the resident set size of the process on behalf of every profile
+    being measured. A single sampler thread is shared by all the stages of a
+    process, so that profiling hundreds of concurrent stages does not cost
+    one thread each.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        super().__init__(name='gnime-rss-sampler', daemon=True)
+        self.pid = os.getpid()
+        self.process = psutil.Process()
+        self._profiles = {}
+        self._lock = threading.Lock()
+        self._active = threading.Condition(self._lock)
+
+    @classmethod
+    def get(cls) -> '_RSSSampler':
+        """The sampler of the current process, started on first use."""
+        with cls._instance_lock:
+            # A forked worker inherits the instance but not its thread.
+            if cls._instance is None or cls._instance.pid != os.getpid():
+                cls._instance = cls()
+                cls._instance.start()
+            return cls._instance
+
+    def _sample(self) -> None:
+        rss = self.process.memory_info().rss
+        for profile in self._profiles.values():
+            profile.peak_rss = max(profile.peak_rss, rss)
+
+    def watch(self, profile: 'StageProfile') -> None:
+        with self._lock:
+            profile.base_rss = self.process.memory_info().rss
+            self._profiles[id(profile)] = profile
+            self._sample()
+            self._active.notify()
+
+    def unwatch(self, profile: 'StageProfile') -> None:
+        with self._lock:
+            self._sample()
+            self._profiles.pop(id(profile), None)
+
+    def run(self):
+        with self._lock:
+            while True:
+                if self._profiles:
+                    self._active.wait(RSS_SAMPLING_INTERVAL)
+                    self._sample()
+                else:
+                    self._active.wait()
+
+
+class StageProfiler:
+    """
+    Context manager profiling the stage executed inside it. While active, the
+    profile is the current profile of the thread (or asyncio task), so that
+    NodeStage can record phases and port I/O into it without the profile
+    being passed around explicitly.
+    """
+
+    def __init__(self, stage_name: str):
+        self.profile = StageProfile(stage_name)
+
+    def __enter__(self) -> StageProfile:
+        _RSSSampler.get().watch(self.profile)
+        self.profile.start = time.time()
+        self._tick = time.perf_counter()
+        self._cpu = time.thread_time()
+        self._token = _current_profile.set(self.profile)
+        return self.profile
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _current_profile.reset(self._token)
+        self.profile.wall_time = time.perf_counter() - self._tick
+        self.profile.cpu_time = time.thread_time() - self._cpu
+        _RSSSampler.get().unwatch(self.profile)
+
+
+def current_profile() -> Optional[StageProfile]:
+    """The profile of the stage executing in the current thread or task, if any."""
+    return _current_profile.get()
+
+
+@contextmanager
+def phase(name: str):
+    """Attribute the time spent inside the block to a phase of the current stage."""
+    profile = current_profile()
+    if profile is None:
+        yield
+    else:
+        with profile.phase(name):
+            yield
+
+
+def record_read(port_name: str, num_bytes: int) -> None:
+    profile = current_profile()
+    if profile is not None:
+        profile.bytes_read[port_name] = profile.bytes_read.get(port_name, 0) + num_bytes
+
+
+def record_write(port_name: str, num_bytes: int) -> None:
+    profile = current_profile()
+    if profile is not None:
+        profile.bytes_written[port_name] = \
+            profile.bytes_written.get(port_name, 0) + num_bytes
+
+
+@dataclass
+class RunReport:
+    """
+    Structured report of a pipeline run, made of the profiles of the stages
+    that were executed.
+    """
+
+    start: float
+    wall_time: float
+    profiles: List[StageProfile]
+
+    def to_dict(self) -> dict:
+        profiles = []
+        for profile in self.profiles:
+            footprint = profile.memory_footprint
+            profile = asdict(profile)
+            del profile['spans']
+            profile['memory_footprint'] = footprint
+            profiles.append(profile)
+        return {
+            'start': self.start,
+            'wall_time': self.wall_time,
+            'stages': profiles,
+        }
+
+    def to_json(self, path: str = None) -> str:
+        """Return the report as JSON, also writing it to path if given."""
+        report = json.dumps(self.to_dict(), indent=2)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(report)
+        return report
+
+    def to_chrome_trace(self, path: str = None) -> dict:
+        """
+        Return the report in the Chrome trace event format, which can be
+        loaded in chrome://tracing or Perfetto, also writing it to path if
+        given. Every stage is a complete event on the thread it ran on, with
+        its phases nested inside it.
+        """
+        events = []
+        for profile in self.profiles:
+            events.append({
+                'name': profile.stage,
+                'cat': 'stage',
+                'ph': 'X',
+                'ts': profile.start * 1e6,
+                'dur': profile.wall_time * 1e6,
+                'pid': profile.pid,
+                'tid': profile.thread,
+                'args': {
+                    'cpu_time': profile.cpu_time,
+                    'peak_rss': profile.peak_rss,
+                    'memory_footprint': profile.memory_footprint,
+                    'bytes_read': profile.bytes_read,
+                    'bytes_written': profile.bytes_written,
+                },
+            })
+            for name, start, duration in profile.spans:
+                events.append({
+                    'name': name,
+                    'cat': 'phase',
+                    'ph': 'X',
+                    'ts': start * 1e6,
+                    'dur': duration * 1e6,
+                    'pid': profile.pid,
+                    'tid': profile.thread,
+                })
+
+        trace = {'traceEvents': events, 'displayTimeUnit': 'ms'}
+        if path is not None:
+            with open(path, 'w') as f:
+                json.dump(trace, f)
+        return trace
@@ -1,8 +1,23 @@
 from abc import ABC, abstractmethod
+from typing import List
 import cloudpickle
 import pickle
+import struct
+import zlib
 
-from .exceptions import InvalidTypeForDeserializationException
+try:
+    import lz4.frame
+except ImportError:  # pragma: no cover
+    lz4 = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+from .exceptions import (
+    InvalidTypeForDeserializationException, MissingDependencyException,
+    SerializationException)
 
 
 class Serializer(ABC):
@@ -35,3 +50,219 @@ class CloudPickleSerializer(Serializer):
             raise InvalidTypeForDeserializationException(
                 'Please ensure the serialized object is of type bytes.')
         return cloudpickle.loads(serialized_obj)
+
+
+# Framed payloads start with a magic number, which a pickle stream never does
+# (they start with the PROTO opcode), followed by the number of segments and,
+# for each segment, its codec and length. The first segment is the pickle
+# stream and the others are its out-of-band buffers.
+FRAME_MAGIC = b'GNM\x01'
+_FRAME_HEADER = struct.Struct('!4sI')
+_SEGMENT_HEADER = struct.Struct('!BQ')
+
+# Codec of each segment of a frame. Zlib is always available, while lz4 and
+# zstd require the lz4 and zstandard packages.
+CODECS = {
+    None: 0,
+    'zlib': 1,
+    'lz4': 2,
+    'zstd': 3,
+}
+_CODEC_NAMES = {codec_id: name for name, codec_id in CODECS.items()}
+
+
+def available_codecs() -> List[str]:
+    """The compression codecs that can be used, fastest first."""
+    codecs = []
+    if lz4 is not None:
+        codecs.append('lz4')
+    if zstandard is not None:
+        codecs.append('zstd')
+    codecs.append('zlib')
+    return codecs
+
+
+def _check_codec(codec: str) -> None:
+    if codec not in CODECS:
+        raise SerializationException(
+            'Please ensure compression is one of: %s'
+            % ', '.join(c for c in CODECS if c is not None))
+    if codec is not None and codec not in available_codecs():
+        raise MissingDependencyException(
+            'Please install %s to use %s compression'
+            % ({'lz4': 'lz4', 'zstd': 'zstandard'}[codec], codec))
+
+
+def compress(codec: str, data, level: int = None) -> bytes:
+    """Compress a bytes-like object with the given codec."""
+    if codec == 'zlib':
+        return zlib.compress(data, 6 if level is None else level)
+    if codec == 'lz4':
+        return lz4.frame.compress(data, compression_level=level or 0)
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compress(data)
+    return bytes(data)
+
+
+def decompress(codec: str, data) -> bytes:
+    """
+    Decompress a bytes-like object compressed with the given codec. Data that
+    is not compressed is returned as it is, without a copy.
+    """
+    _check_codec(codec)
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    if codec == 'lz4':
+        return lz4.frame.decompress(data, return_bytearray=True)
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def deserialize_any(serialized_obj: bytes, writable: bool = True) -> object:
+    """
+    Deserialize a payload written by any of the serializers of this module:
+    frames are decoded according to their header, and anything else is
+    loaded as a pickle stream (which includes the output of
+    PickleSerializer and CloudPickleSerializer). Readers can therefore
+    decode port data whichever serializer the writer chose.
+
+    The arrays of a frame are rebuilt on top of its out-of-band buffers.
+    Uncompressed buffers are sliced from the payload without a copy, so when
+    the payload is immutable (e.g. bytes read from the disk cache), the
+    arrays are read-only. With writable set, as by default, such buffers are
+    copied once, so that the arrays are writable as when loaded from an
+    in-band pickle. Readers that do not modify the value can skip that copy.
+    """
+    if not isinstance(serialized_obj, (bytes, bytearray, memoryview)):
+        raise InvalidTypeForDeserializationException(
+            'Please ensure the serialized object is of type bytes.')
+
+    view = memoryview(serialized_obj)
+    if bytes(view[:len(FRAME_MAGIC)]) != FRAME_MAGIC:
+        return pickle.loads(view)
+
+    _, num_segments = _FRAME_HEADER.unpack_from(view)
+    offset = _FRAME_HEADER.size
+    headers = []
+    for _ in range(num_segments):
+        headers.append(_SEGMENT_HEADER.unpack_from(view, offset))
+        offset += _SEGMENT_HEADER.size
+
+    segments = []
+    for codec_id, length in headers:
+        segment = decompress(_CODEC_NAMES[codec_id], view[offset:offset + length])
+        if writable and segments and memoryview(segment).readonly:
+            segment = bytearray(segment)
+        segments.append(segment)
+        offset += length
+
+    return pickle.loads(segments[0], buffers=segments[1:])
+
+
+class FramedSerializer(Serializer):
+    """
+    Base class of the serializers writing self-describing frames. The value
+    is pickled with protocol 5 and its large contiguous buffers (e.g. the
+    data of NumPy arrays and pandas DataFrames) are taken out-of-band, so
+    that they are compressed or copied into the frame straight from the
+    memory of the value, without first being copied into the pickle stream.
+    Subclasses choose the codec of every segment of the frame.
+    """
+
+    def _codec(self, segment: memoryview) -> str:
+        return None
+
+    def _compress(self, codec: str, segment: memoryview) -> bytes:
+        return compress(codec, segment)
+
+    def serialize(self, obj: object) -> bytes:
+        buffers = []
+
+        def collect(buffer: pickle.PickleBuffer) -> bool:
+            try:
+                buffers.append(buffer.raw())
+            except BufferError:  # not contiguous, so kept in-band
+                return True
+            return False
+
+        stream = pickle.dumps(obj, protocol=5, buffer_callback=collect)
+        segments = [memoryview(stream)] + buffers
+        codecs = [self._codec(segment) for segment in segments]
+        if not buffers and codecs[0] is None:
+            return stream
+
+        header = [_FRAME_HEADER.pack(FRAME_MAGIC, len(segments))]
+        body = []
+        for segment, codec in zip(segments, codecs):
+            if codec is not None:
+                segment = self._compress(codec, segment)
+            header.append(_SEGMENT_HEADER.pack(CODECS[codec], len(segment)))
+            body.append(segment)
+        return b''.join(header + body)
+
+    def deserialize(self, serialized_obj: bytes) -> object:
+        return deserialize_any(serialized_obj)
+
+
+class Pickle5Serializer(FramedSerializer):
+    """
+    Serializer using pickle protocol 5 with out-of-band buffers, optionally
+    compressing every segment with the given codec.
+
+    compression: None, 'zlib', 'lz4' or 'zstd'.
+    level: Compression level, defaulting to the codec's own default.
+    """
+
+    def __init__(self, compression: str = None, level: int = None):
+        _check_codec(compression)
+        self.compression = compression
+        self.level = level
+
+    def _codec(self, segment: memoryview) -> str:
+        return self.compression
+
+    def _compress(self, codec: str, segment: memoryview) -> bytes:
+        return compress(codec, segment, self.level)
+
+
+class AutoSerializer(FramedSerializer):
+    """
+    Serializer picking the encoding of each part of a value. Small values and
+    buffers are stored as they are, since compressing them costs more than it
+    saves. Larger buffers are compressed with the fastest available codec
+    only if a sample of them compresses well, so incompressible data (e.g.
+    random floats) is copied rather than run through the compressor.
+
+    compression: Codec for the buffers that are compressed, defaulting to the
+        fastest one available (lz4, then zstd, then zlib).
+    level: Compression level, defaulting to a fast one.
+    min_size: Size in bytes below which a segment is never compressed.
+    min_ratio: Compressed to raw size ratio a sample must reach for the
+        segment to be compressed.
+    sample_size: Size in bytes of the sample compressed to decide.
+    """
+
+    def __init__(self, compression: str = None, level: int = None,
+                 min_size: int = 64 * 1024, min_ratio: float = 0.8,
+                 sample_size: int = 64 * 1024):
+        if compression is None:
+            compression = available_codecs()[0]
+        _check_codec(compression)
+        self.compression = compression
+        self.level = level if level is not None or compression != 'zlib' else 1
+        self.min_size = min_size
+        self.min_ratio = min_ratio
+        self.sample_size = sample_size
+
+    def _codec(self, segment: memoryview) -> str:
+        if segment.nbytes < self.min_size:
+            return None
+        sample = segment.cast('B')[:self.sample_size]
+        if not sample.nbytes:  # empty buffer, or sampling disabled
+            return None
+        ratio = len(compress(self.compression, sample, self.level)) / len(sample)
+        return self.compression if ratio <= self.min_ratio else None
+
+    def _compress(self, codec: str, segment: memoryview) -> bytes:
+        return compress(codec, segment, self.level)
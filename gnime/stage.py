@@ -1,9 +1,59 @@
 from abc import ABC, abstractmethod
+from dataclasses import replace
+from typing import Dict, List, Optional
 import diskcache
+import inspect
+import asyncio
+import logging
+import hashlib
+import json
+import time
+import os
 
-from .serialization import PickleSerializer
-from .cache import DiskCache
+from .serialization import PickleSerializer, Serializer, deserialize_any
+from .cache import DiskCache, ArrowTableCache, MemoryCache, TableReference
+from .hashing import hash_value, hash_config, hash_source
+from .profiling import StageProfiler, phase, record_read, record_write
+from .nodes.port import Port, PortType
+from .nodes.node import collect_batches
 from .core import Node
+from .exceptions import InvalidValueTypeException
+
+
+_MISSING = object()
+
+# Run-state bookkeeping uses one key per stage, so that recording the start or
+# completion of a stage costs the same whatever the size of the pipeline, and
+# concurrent executors never overwrite each other's updates. The keys carry a
+# tag so that the run state can be cleared at once, and the number of stages
+# in progress and done is kept in atomic counters. Like all keys, they are
+# prefixed with the pipeline's namespace (see DiskCache.key).
+RUN_STATE_TAG = 'run_state'
+IN_PROGRESS_COUNT = 'num_in_progress'
+DONE_COUNT = 'num_done'
+
+
+def in_progress_key(stage_name: str) -> str:
+    """Key marking a stage as in progress, holding the time it started."""
+    return 'in_progress:%s' % stage_name
+
+
+def done_key(stage_name: str) -> str:
+    """Key marking a stage as done in the current run, holding the time it finished."""
+    return 'done:%s' % stage_name
+
+
+def run_to_completion(fn: callable, *args):
+    """
+    Call the run method of a stage from synchronous code. If it is a
+    coroutine function, the coroutine is run to completion on an event loop
+    of its own, so that async stages also work on the serial, pool and
+    streaming engines.
+    """
+    result = fn(*args)
+    if inspect.iscoroutine(result):
+        return asyncio.run(result)
+    return result
 
 
 class Stage(ABC):
@@ -13,8 +63,13 @@ class Stage(ABC):
 
     preceding_stages: List of preceding stages for the stage
     name: Name of the stage
+    memory_estimate: Memory the stage is expected to need while it runs, in
+        bytes. When None, a pipeline run with a memory budget uses the
+        footprint measured by previous runs.
     """
 
+    memory_estimate: Optional[int] = None
+
     def __init__(self):
         self.preceding_stages = list()
 
@@ -23,6 +78,15 @@ class Stage(ABC):
         self.preceding_stages.append(pipeline_stage)
         return self
 
+    def fingerprint(self) -> Optional[str]:
+        """
+        Fingerprint of the external data read by the stage, e.g. the files
+        read by a source. The pipeline compares fingerprints with those of
+        the previous run to find what has to be recomputed. Stages that do
+        not read external data return None.
+        """
+        return None
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -38,36 +102,69 @@ class StageExecutor(PickleSerializer, DiskCache):
     Context manager for the execution of a stage, or group of stages, of a
     pipeline.
 
-    The setup phase (__enter__) persists relevant metadata such as the stages
-    currently in progress to a Redis server.
+    The setup phase (__enter__) marks the stages as in progress in the disk
+    cache.
+
+    The teardown phase (__exit__) removes the in-progress marks, and marks
+    the stages as done if they completed without raising.
 
-    The teardown phase (__exit__) deletes relevant metadata from the Redis
-    server.
+    Every stage has its own keys (see in_progress_key and done_key), and the
+    counters of stages in progress and done are updated atomically, so each
+    update costs O(1) and concurrent executors never lose each other's
+    updates.
 
-    redis_instance: A connection to Redis.
+    When a single stage is executed, it is also profiled (see
+    gnime.profiling) and its StageProfile is written to the cache under
+    'profile:<stage name>', from where the pipeline collects it.
+
+    disk_cache: The disk cache holding the run state.
     stages: The stages that are currently in progress.
+    namespace: The namespace of the pipeline's keys in the disk cache.
+    pipeline: The snapshot of the pipeline stored by Pipeline.start (see
+        Pipeline.snapshot), only read from the cache when accessed.
     """
 
-    def __init__(self, disk_cache: diskcache.Cache, stages):
-        DiskCache.__init__(self, disk_cache)
+    def __init__(self, disk_cache: diskcache.Cache, stages, profile: bool = True,
+                 namespace: str = None):
+        DiskCache.__init__(self, disk_cache, namespace)
 
-        self.pipeline = self.read('pipeline')
         self.stages = stages
+        self.profiler = StageProfiler(stages[0]) \
+            if profile and len(stages) == 1 else None
+
+    @property
+    def pipeline(self) -> Optional[dict]:
+        snapshot = self.read('pipeline')
+        return json.loads(snapshot) if snapshot is not None else None
 
     def __enter__(self):
-        self.write('in_progress', self.serialize(self.stages))
+        if self.profiler is not None:
+            self.profiler.__enter__()
+
+        tag = self.key(RUN_STATE_TAG)
+        with self.disk_cache.transact():
+            for stage in self.stages:
+                self.disk_cache.set(
+                    self.key(in_progress_key(stage)), time.time(), tag=tag)
+            self.disk_cache.incr(self.key(IN_PROGRESS_COUNT), len(self.stages))
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        completed = self.deserialize(self.read('in_progress'))
-        current_done = self.read('done')
-        if current_done is None:
-            current_done = []
-        else:
-            current_done = self.deserialize(current_done)
-        current_done += completed
-        self.write('done', self.serialize(current_done))
-        self.delete('in_progress')
+        tag = self.key(RUN_STATE_TAG)
+        with self.disk_cache.transact():
+            for stage in self.stages:
+                self.disk_cache.delete(self.key(in_progress_key(stage)))
+                if exc_type is None:
+                    self.disk_cache.set(
+                        self.key(done_key(stage)), time.time(), tag=tag)
+            self.disk_cache.decr(self.key(IN_PROGRESS_COUNT), len(self.stages))
+            if exc_type is None:
+                self.disk_cache.incr(self.key(DONE_COUNT), len(self.stages))
+
+        if self.profiler is not None:
+            self.profiler.__exit__(exc_type, exc_val, exc_tb)
+            self.write(
+                'profile:%s' % self.stages[0], self.serialize(self.profiler.profile))
 
     @staticmethod
     def execute(fn: callable, *args, **kwargs) -> None:
@@ -94,6 +191,13 @@ class DiskCacheStage(Stage, PickleSerializer, DiskCache):
     def write(self, k: str, v: object) -> None:
         DiskCache.write(self, k, self.serialize(v))
 
+    def read_many(self, keys: List[str]) -> list:
+        return [self.deserialize(v) for v in DiskCache.read_many(self, keys)]
+
+    def write_many(self, items: Dict[str, object]) -> None:
+        DiskCache.write_many(
+            self, {k: self.serialize(v) for k, v in items.items()})
+
     @property
     def name(self) -> str:
         """
@@ -104,25 +208,289 @@ class DiskCacheStage(Stage, PickleSerializer, DiskCache):
 
 
 class NodeStage(Node, DiskCacheStage):
+    """
+    Stage that runs a node, reading its input ports from and writing its
+    output ports to the disk cache.
+
+    table_storage: How DataFrames on table ports are stored. 'pickle' stores
+        them in the disk cache like every other value, while 'arrow' writes
+        them to Arrow files next to the disk cache which consumers memory-map.
+        The memory-mapped frames are read-only, so consumers must copy them
+        before modifying them in place. Frames Arrow cannot represent (e.g.
+        object columns mixing types) are pickled instead.
+    persist: Whether outputs always go to the disk cache, even when the
+        pipeline hands data over in memory.
+    memory_cache: In-process cache set by the pipeline for single-process
+        runs. When set, outputs are passed to consumers by reference instead
+        of through the disk cache, so consumers must not mutate their inputs.
+    memoize: Whether the outputs of the stage are cached in the disk cache
+        under a key derived from the stage's source code, config and inputs.
+        When the key is found, run is skipped and the cached outputs are used.
+    serializer: Serializer of the output ports written to the disk cache
+        (see gnime.serialization), unless a port sets its own. When None,
+        outputs are pickled. Inputs are decoded whatever serializer the
+        producing stage used.
+    """
+
+    table_storage = 'pickle'
+    persist = False
+    memoize = False
+    memory_cache: MemoryCache = None
+    serializer: Serializer = None
 
     def __init__(self, cache: diskcache.Cache, config: dict = None):
         DiskCacheStage.__init__(self, cache=cache)
         self.config = config
 
+    @property
+    def table_cache(self) -> ArrowTableCache:
+        directory = os.path.join(self.disk_cache.directory, 'tables')
+        if self.namespace:
+            directory = os.path.join(directory, self.namespace)
+        return ArrowTableCache(directory)
+
+    def read_port(self, port: Port) -> object:
+        return self.read_ports([port])[0]
+
+    def read_ports(self, ports: List[Port]) -> list:
+        """
+        Method to read the values of several input ports. Values held in the
+        memory cache are taken from it, and all the others are fetched from
+        the disk cache at once, in a single transaction.
+        """
+        values = [_MISSING] * len(ports)
+        if self.memory_cache is not None:
+            # Fetched in one step, as the pipeline may spill the value to
+            # the disk cache at any time.
+            values = [self.memory_cache.read(port.name, _MISSING) for port in ports]
+
+        missing = [idx for idx, value in enumerate(values) if value is _MISSING]
+        if not missing:
+            return values
+
+        with phase('cache_read'):
+            serialized = DiskCache.read_many(self, [ports[idx].name for idx in missing])
+        for idx, data in zip(missing, serialized):
+            port = ports[idx]
+            with phase('deserialize'):
+                value = deserialize_any(data)
+            record_read(port.name, len(data))
+
+            if isinstance(value, TableReference):
+                key = value.key
+                with phase('table_read'):
+                    value = self.table_cache.read(key)
+                record_read(port.name, self.table_cache.size(key))
+            values[idx] = value
+        return values
+
+    def write_port(self, port: Port, value: object) -> None:
+        self.write_ports([port], [value])
+
+    def write_ports(self, ports: List[Port], values: list) -> None:
+        """
+        Method to write the values of several output ports. Values go to the
+        memory cache when the pipeline hands data over in memory, and are
+        otherwise written to the disk cache at once, in a single transaction.
+        """
+        if self.memory_cache is not None and not self.persist:
+            for port, value in zip(ports, values):
+                self.memory_cache.write(port.name, value)
+            return
+        self._write_disk_ports(ports, values)
+
+    def _write_disk_ports(self, ports: List[Port], values: list) -> None:
+        if not ports:
+            return
+        items = {}
+        for port, value in zip(ports, values):
+            if self.table_storage == 'arrow' and port.type == PortType.TABLE \
+                    and ArrowTableCache.supports(value):
+                try:
+                    with phase('table_write'):
+                        self.table_cache.write(port.name, value)
+                except InvalidValueTypeException:
+                    logging.info(
+                        'Port %s cannot be stored as an Arrow table, pickling it',
+                        port.name, exc_info=True)
+                    # A table stored by a previous run must not shadow the value.
+                    self.table_cache.delete(port.name)
+                else:
+                    record_write(port.name, self.table_cache.size(port.name))
+                    value = TableReference(port.name)
+
+            serializer = port.serializer or self.serializer or self
+            with phase('serialize'):
+                items[port.name] = serializer.serialize(value)
+            record_write(port.name, len(items[port.name]))
+
+        with phase('cache_write'):
+            DiskCache.write_many(self, items)
+
+    def spill_port(self, port: Port) -> None:
+        """
+        Method to move the data of an output port from the memory cache to
+        the disk cache, from where consumers then read it.
+        """
+        if self.memory_cache is None:
+            return
+        value = self.memory_cache.read(port.name, _MISSING)
+        if value is _MISSING:
+            return
+        self._write_disk_ports([port], [value])
+        self.memory_cache.delete(port.name)
+
+    def has_port(self, port: Port) -> bool:
+        if self.memory_cache is not None and port.name in self.memory_cache:
+            return True
+
+        if not self.exists(port.name):
+            return False
+        if self.table_storage == 'arrow':
+            value = deserialize_any(DiskCache.read(self, port.name), writable=False)
+            if isinstance(value, TableReference):
+                return value.key in self.table_cache
+        return True
+
+    def delete_port(self, port: Port) -> None:
+        if self.memory_cache is not None:
+            self.memory_cache.delete(port.name)
+        self.delete(port.name)
+        if self.table_storage == 'arrow':
+            self.table_cache.delete(port.name)
+
+    def memo_key(self, inputs: list) -> str:
+        """
+        Key under which the outputs of the stage are cached, given the values
+        of its input ports.
+        """
+        digest = hashlib.sha256()
+        digest.update(hash_source(self.implementation).encode())
+        digest.update(hash_config(self.config).encode())
+        for value in inputs:
+            digest.update(hash_value(value).encode())
+        return 'memo:%s' % digest.hexdigest()
+
     def pre_execute(self):
-        inputs = [
-            self.read(port.name)
-            for port in getattr(self, 'input_ports', [])
-        ]
+        inputs = self.read_ports(getattr(self, 'input_ports', []))
         return inputs
 
+    @property
+    def implementation(self) -> type:
+        """The class whose code computes the outputs of the stage."""
+        return type(self)
+
+    @property
+    def is_async(self) -> bool:
+        """Whether the run method of the stage is a coroutine function."""
+        return inspect.iscoroutinefunction(self.run)
+
+    def _recall(self, inputs: list):
+        """
+        Method to look up the memoized outputs of the stage for the given
+        inputs.
+
+        Returns:
+            tuple: The memo key (None if the stage is not memoized) and the
+                cached outputs (_MISSING if they have to be computed).
+        """
+        if not self.memoize:
+            return None, _MISSING
+        key = self.memo_key(inputs)
+        cached = DiskCache.read(self, key)
+        if cached is None:
+            return key, _MISSING
+        logging.info('Reusing cached outputs of stage: %s', self.name)
+        return key, deserialize_any(cached)
+
+    @staticmethod
+    def _collect(outputs):
+        """
+        Method to collect iterator outputs (e.g. of a CSV reader with a chunk
+        size) into whole values. Iterators are only streamed by
+        Pipeline.stream: otherwise every consumer must get the whole table,
+        and it must be possible to cache it.
+        """
+        if isinstance(outputs, tuple):
+            return tuple(collect_batches(output) for output in outputs)
+        return collect_batches(outputs)
+
     def execute(self):
-        inputs = self.pre_execute()
-        outputs = self.run(*inputs)
-        self.post_execute(outputs)
+        with phase('pre_execute'):
+            inputs = self.pre_execute()
+        key, outputs = self._recall(inputs)
+        if outputs is _MISSING:
+            with phase('run'):
+                outputs = self._collect(run_to_completion(self.run, *inputs))
+            if key is not None:
+                DiskCache.write(self, key, (self.serializer or self).serialize(outputs))
+        with phase('post_execute'):
+            self.post_execute(outputs)
+
+    async def execute_async(self):
+        """
+        Method to execute the stage on a running event loop. The run method of
+        an async stage is awaited, so that the stage only occupies the loop
+        while it is not waiting. Port I/O stays on the loop thread. Sync
+        stages are offloaded to the loop's default thread pool executor.
+        """
+        if not self.is_async:
+            await asyncio.to_thread(self.execute)
+            return
+
+        with phase('pre_execute'):
+            inputs = self.pre_execute()
+        key, outputs = self._recall(inputs)
+        if outputs is _MISSING:
+            with phase('run'):
+                outputs = self._collect(await self.run(*inputs))
+            if key is not None:
+                DiskCache.write(self, key, (self.serializer or self).serialize(outputs))
+        with phase('post_execute'):
+            self.post_execute(outputs)
 
     def post_execute(self, outputs):
         if not isinstance(outputs, tuple):
             outputs = (outputs,)
-        for idx, port in enumerate(getattr(self, 'output_ports', [])):
-            self.write(port.name, outputs[idx])
+        ports = getattr(self, 'output_ports', [])
+        self.write_ports(ports, [outputs[idx] for idx in range(len(ports))])
+
+
+class NodeAdapterStage(NodeStage):
+    """
+    Stage running a node of the gnime.nodes library (e.g. CSVReaderNode or
+    ParquetWriterNode) in a pipeline. The stage takes the name, ports, config,
+    batch mode and fingerprint of the node, and its run calls the node's
+    execute.
+
+    Stages exchange data through ports of the same name, so the ports of the
+    node can be renamed to connect it, e.g. {'Input Data': 'sales'}.
+
+    node: The node to run.
+    ports: New names of the node's ports, by their name on the node.
+    """
+
+    def __init__(self, cache: diskcache.Cache, node: Node, ports: Dict[str, str] = None):
+        NodeStage.__init__(self, cache=cache, config=getattr(node, 'config', None))
+        ports = ports or {}
+        self.node = node
+        self.input_ports = [
+            replace(port, name=ports.get(port.name, port.name)) for port in node.input_ports]
+        self.output_ports = [
+            replace(port, name=ports.get(port.name, port.name)) for port in node.output_ports]
+        self.batch_mode = node.batch_mode
+
+    @property
+    def name(self) -> str:
+        return self.node.name
+
+    @property
+    def implementation(self) -> type:
+        return type(self.node)
+
+    def fingerprint(self) -> Optional[str]:
+        fingerprint = getattr(self.node, 'fingerprint', None)
+        return fingerprint() if fingerprint is not None else None
+
+    def run(self, *inputs):
+        return self.node.execute(*inputs)
@@ -0,0 +1,247 @@
+from itertools import zip_longest
+import threading
+import logging
+import queue
+
+import networkx as nx
+import pandas as pd
+
+from .exceptions import DAGVerificationException, BatchMismatchException
+from .nodes.node import BatchMode, iter_batches
+from .stage import StageExecutor, run_to_completion
+
+
+_END = object()
+
+
+class StreamAborted(Exception):
+    """Raised inside a stage thread when another stage of the stream failed."""
+
+
+class StreamExecutor:
+    """
+    Executes a pipeline of node stages by streaming batches of data through
+    the connected ports, instead of running each stage once on its complete
+    inputs. Every stage runs in its own thread and consecutive stages are
+    connected by bounded queues, so that all stages work concurrently on
+    different batches while at most `queue_size` batches wait on each edge.
+
+    How a stage is called depends on its batch_mode:
+        ROW: once per batch, with one batch of each input. All inputs must
+            have the same number of batches.
+        BLOCKING: once, with all batches of each input concatenated.
+        STREAM: once, with an iterator of batches for each input.
+
+    ROW stages read their inputs in lockstep. BLOCKING and STREAM stages with
+    several inputs may read them in any order, so their inputs are drained
+    concurrently into unbounded buffers, and the batches of the inputs not
+    being read are held in memory.
+
+    Source stages are called once, and an output that is an iterator (e.g. a
+    CSV reader with a chunk size) is streamed batch by batch. Outputs that no
+    stage consumes are discarded, unless their port is retained, in which case
+    they are concatenated and written to the stage's cache.
+
+    pipeline: The DAG of the pipeline, as built by gnime.pipeline.Pipeline.
+    disk_cache: The disk cache used for the run-state bookkeeping.
+    queue_size: The maximum number of batches waiting on each edge.
+    namespace: The namespace of the pipeline's keys in the disk cache.
+    """
+
+    def __init__(self, pipeline: nx.DiGraph, disk_cache, queue_size: int = 8,
+                 namespace: str = None):
+        self.pipeline = pipeline
+        self.disk_cache = disk_cache
+        self.queue_size = queue_size
+        self.namespace = namespace
+
+        self._abort = threading.Event()
+        self._errors = []
+        self._inputs = {}
+        self._outputs = {}
+        self._connect()
+
+    def _stage(self, stage_name: str):
+        return self.pipeline.nodes[stage_name]['stage_wrapper']
+
+    def _connect(self) -> None:
+        """
+        Create one queue per consumed input port, fed by the closest upstream
+        stage with an output port of the same name.
+        """
+
+        for consumer in self.pipeline.nodes:
+            for port in getattr(self._stage(consumer), 'input_ports', []):
+                producers = [
+                    producer for producer in nx.ancestors(self.pipeline, consumer)
+                    if port.name in [
+                        p.name for p in getattr(self._stage(producer), 'output_ports', [])]
+                ]
+                if not producers:
+                    raise DAGVerificationException(
+                        'No upstream stage of %s produces port %s' % (consumer, port.name))
+                producer = min(
+                    producers,
+                    key=lambda p: nx.shortest_path_length(self.pipeline, p, consumer))
+                q = queue.Queue(self.queue_size)
+                self._inputs[(consumer, port.name)] = q
+                self._outputs.setdefault((producer, port.name), []).append(q)
+
+    def _put(self, q: queue.Queue, item) -> None:
+        while True:
+            if self._abort.is_set():
+                raise StreamAborted()
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q: queue.Queue):
+        while True:
+            if self._abort.is_set():
+                raise StreamAborted()
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def _batches(self, q: queue.Queue):
+        while (batch := self._get(q)) is not _END:
+            yield batch
+
+    def _buffer(self, stage_name: str, port_name: str) -> queue.Queue:
+        """
+        Start a thread moving the batches of an input port to an unbounded
+        queue as soon as they arrive, and return that queue. A stage reading
+        one input to its end before the next would otherwise deadlock when
+        its inputs share an upstream stage: the queue of the input not being
+        read fills up, which blocks the shared stage, which in turn never
+        ends the input being read.
+        """
+
+        buffer = queue.Queue()
+
+        def pump() -> None:
+            try:
+                for batch in self._batches(self._inputs[(stage_name, port_name)]):
+                    buffer.put(batch)
+            except StreamAborted:
+                pass
+            finally:
+                buffer.put(_END)
+
+        threading.Thread(
+            target=pump, name='gnime-stream-%s-%s' % (stage_name, port_name),
+            daemon=True).start()
+        return buffer
+
+    @staticmethod
+    def _combine(batches: list):
+        if len(batches) == 1:
+            return batches[0]
+        if batches and all(isinstance(b, pd.DataFrame) for b in batches):
+            return pd.concat(batches, ignore_index=True)
+        return batches
+
+    def _emit(self, stage_name: str, outputs, retained: dict) -> None:
+        """Put every batch of the outputs of a stage on its outgoing queues."""
+
+        stage = self._stage(stage_name)
+        ports = getattr(stage, 'output_ports', [])
+        if not ports:
+            return
+        if not isinstance(outputs, tuple):
+            outputs = (outputs,)
+
+        streams = [iter_batches(outputs[idx]) for idx in range(len(ports))]
+        for batches in zip_longest(*streams, fillvalue=_END):
+            for port, batch in zip(ports, batches):
+                if batch is _END:
+                    continue
+                for q in self._outputs.get((stage_name, port.name), []):
+                    self._put(q, batch)
+                if port.name in retained:
+                    retained[port.name].append(batch)
+
+    def _run_stage(self, stage_name: str) -> None:
+        stage = self._stage(stage_name)
+        input_ports = getattr(stage, 'input_ports', [])
+        retained = {
+            port.name: [] for port in getattr(stage, 'output_ports', [])
+            if port.retain and (stage_name, port.name) not in self._outputs
+        }
+
+        try:
+            with StageExecutor(self.disk_cache, [stage_name], namespace=self.namespace):
+                mode = getattr(stage, 'batch_mode', BatchMode.BLOCKING)
+                if len(input_ports) > 1 and mode != BatchMode.ROW:
+                    queues = [self._buffer(stage_name, port.name) for port in input_ports]
+                else:
+                    queues = [self._inputs[(stage_name, port.name)] for port in input_ports]
+                inputs = [self._batches(q) for q in queues]
+
+                if not inputs:
+                    self._emit(stage_name, run_to_completion(stage.run), retained)
+                elif mode == BatchMode.ROW:
+                    for batches in zip_longest(*inputs, fillvalue=_END):
+                        if any(batch is _END for batch in batches):
+                            raise BatchMismatchException(
+                                'The inputs of %s end after different numbers '
+                                'of batches' % stage_name)
+                        self._emit(
+                            stage_name, run_to_completion(stage.run, *batches), retained)
+                elif mode == BatchMode.STREAM:
+                    self._emit(
+                        stage_name, run_to_completion(stage.run, *inputs), retained)
+                else:
+                    self._emit(
+                        stage_name,
+                        run_to_completion(
+                            stage.run, *[self._combine(list(i)) for i in inputs]),
+                        retained)
+
+                # Inputs left over by a stage that stopped reading early are
+                # drained so that upstream stages are not blocked on a full queue.
+                for i in inputs:
+                    for _ in i:
+                        pass
+
+                for port in getattr(stage, 'output_ports', []):
+                    if port.name in retained:
+                        stage.write_port(port, self._combine(retained[port.name]))
+        except StreamAborted:
+            pass
+        except BaseException as e:
+            logging.exception('Stage %s failed', stage_name)
+            self._errors.append(e)
+            self._abort.set()
+        finally:
+            try:
+                for (producer, _), queues in self._outputs.items():
+                    if producer == stage_name:
+                        for q in queues:
+                            self._put(q, _END)
+            except StreamAborted:
+                pass
+
+    def execute(self) -> None:
+        """
+        Run every stage of the pipeline in its own thread and wait for all of
+        them to finish. The first exception raised by a stage stops the
+        stream and is re-raised.
+        """
+
+        threads = [
+            threading.Thread(
+                target=self._run_stage, args=(stage_name,),
+                name='gnime-stream-%s' % stage_name, daemon=True)
+            for stage_name in nx.topological_sort(self.pipeline)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self._errors:
+            raise self._errors[0]
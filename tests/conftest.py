@@ -0,0 +1,9 @@
+import diskcache
+import pytest
+
+
+@pytest.fixture
+def cache(tmp_path):
+    disk_cache = diskcache.Cache(str(tmp_path / 'cache'))
+    yield disk_cache
+    disk_cache.close()
@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import pytest
+
+from gnime.nodes.node import input_table, output_table
+from gnime.pipeline import Pipeline
+from gnime.stage import NodeStage
+
+state = {'running': 0, 'peak': 0}
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    state.update(running=0, peak=0)
+    yield
+
+
+class Wait(NodeStage):
+    """Async stage waiting on simulated I/O."""
+
+    @property
+    def name(self) -> str:
+        return self.config['name']
+
+    async def run(self):
+        state['running'] += 1
+        state['peak'] = max(state['peak'], state['running'])
+        await asyncio.sleep(0.2)
+        state['running'] -= 1
+
+
+def waits(cache, count):
+    pipeline = Pipeline(cache)
+    pipeline.add_stages([Wait(cache=cache, config={'name': 'Wait%d' % idx}) for idx in range(count)])
+    return pipeline
+
+
+def test_async_stages_wait_concurrently_on_the_loop(cache):
+    tick = time.perf_counter()
+    asyncio.run(waits(cache, 20).start_async())
+    assert time.perf_counter() - tick < 1.0
+    assert state['peak'] == 20
+
+
+def test_concurrency_is_bounded(cache):
+    asyncio.run(waits(cache, 6).start_async(max_concurrency=2))
+    assert state['peak'] == 2
+
+
+@output_table(name='x')
+class Fetch(NodeStage):
+    async def run(self):
+        await asyncio.sleep(0.01)
+        return [1, 2, 3]
+
+
+@input_table(name='x')
+@output_table(name='y')
+class Total(NodeStage):
+    def run(self, x):
+        return sum(x)
+
+
+def fetch_total(cache):
+    fetch = Fetch(cache=cache)
+    total = Total(cache=cache).after(fetch)
+    pipeline = Pipeline(cache)
+    pipeline.add_stages([fetch, total])
+    return pipeline, total
+
+
+@pytest.mark.parametrize('in_memory', [True, False])
+def test_sync_and_async_stages_exchange_data(cache, in_memory):
+    pipeline, total = fetch_total(cache)
+    asyncio.run(pipeline.start_async(in_memory=in_memory))
+    result = pipeline.memory_cache.read('y') if in_memory else total.read('y')
+    assert result == 6
+    assert [profile.stage for profile in pipeline.run_report.profiles] == ['Fetch', 'Total']
+
+
+def test_async_stages_also_run_on_the_other_engines(cache):
+    pipeline, total = fetch_total(cache)
+    pipeline.start(num_cores=2, in_memory=False)
+    pipeline.close()
+    assert total.read('y') == 6
+
+
+def test_failures_cancel_the_other_stages(cache):
+    class Fail(NodeStage):
+        async def run(self):
+            await asyncio.sleep(0.05)
+            raise ValueError('Fail failed')
+
+    pipeline = waits(cache, 3)
+    pipeline.add_stage(Fail(cache=cache))
+    with pytest.raises(ValueError, match='Fail failed'):
+        asyncio.run(pipeline.start_async())
+    # The waiting stages were cancelled before they finished.
+    assert state['running'] == 3
@@ -0,0 +1,142 @@
+import os
+
+import pandas as pd
+import pytest
+
+from gnime.cache import ArrowTableCache, DiskCache, TableReference
+from gnime.exceptions import InvalidValueTypeException
+from gnime.nodes.node import input_table, output_table
+from gnime.pipeline import Pipeline
+from gnime.stage import NodeStage
+
+received = []
+
+
+@pytest.fixture(autouse=True)
+def clear_received():
+    received.clear()
+    yield
+
+
+def test_arrow_tables_round_trip(tmp_path):
+    tables = ArrowTableCache(str(tmp_path))
+    frame = pd.DataFrame({'a': [1, 2], 'b': ['x', 'y']})
+    tables.write('t', frame)
+
+    assert 't' in tables
+    pd.testing.assert_frame_equal(tables.read('t'), frame)
+    tables.delete('t')
+    assert 't' not in tables and tables.read('t') is None
+
+
+def test_arrow_tables_reject_frames_arrow_cannot_represent(tmp_path):
+    tables = ArrowTableCache(str(tmp_path))
+    with pytest.raises(InvalidValueTypeException):
+        tables.write('t', pd.DataFrame({'a': ['x', 1]}))
+    assert os.listdir(tmp_path) == []
+
+
+def pipeline_of(cache, frame):
+    @output_table(name='x')
+    class Load(NodeStage):
+        table_storage = 'arrow'
+
+        def run(self):
+            return frame
+
+    @input_table(name='x')
+    class Consume(NodeStage):
+        def run(self, x):
+            received.append(x)
+
+    load = Load(cache=cache)
+    pipeline = Pipeline(cache)
+    pipeline.add_stages([load, Consume(cache=cache).after(load)])
+    return pipeline, load
+
+
+def test_arrow_storage_hands_tables_over_through_files(cache):
+    frame = pd.DataFrame({'a': range(5)})
+    pipeline, load = pipeline_of(cache, frame)
+    pipeline.start(in_memory=False)
+
+    pd.testing.assert_frame_equal(received[0], frame)
+    # The memory-mapped frames are read-only.
+    with pytest.raises(ValueError):
+        received[0].loc[0, 'a'] = 99
+
+
+def test_arrow_storage_pickles_frames_arrow_cannot_represent(cache):
+    frame = pd.DataFrame({'a': ['x', 1, 2.5]})
+    pipeline, load = pipeline_of(cache, frame)
+    pipeline.start(in_memory=False)
+
+    pd.testing.assert_frame_equal(received[0], frame)
+    assert 'x' not in load.table_cache
+
+
+def test_arrow_storage_writes_a_reference_to_the_disk_cache(cache):
+    frame = pd.DataFrame({'a': range(5)})
+    load = pipeline_of(cache, frame)[1]
+    load.write_port(load.output_ports[0], frame)
+
+    assert load.read('x') == TableReference('x')
+    pd.testing.assert_frame_equal(load.read_port(load.output_ports[0]), frame)
+
+
+def test_namespaces_prefix_the_keys(cache):
+    first, second = DiskCache(cache, namespace='first'), DiskCache(cache, namespace='second')
+    first.write('k', b'1')
+    second.write('k', b'2')
+
+    assert (first.read('k'), second.read('k')) == (b'1', b'2')
+    assert DiskCache(cache).read('k') is None
+    assert cache.get('first:k') == b'1'
+    first.delete('k')
+    assert not first.exists('k') and second.exists('k')
+
+
+def test_read_many_returns_the_values_in_the_order_of_the_keys(cache):
+    disk_cache = DiskCache(cache, namespace='ns')
+    disk_cache.write_many({'a': b'1', 'b': b'2'})
+
+    assert disk_cache.read_many(['b', 'missing', 'a']) == [b'2', None, b'1']
+    assert cache.get('ns:a') == b'1'
+
+
+def test_write_many_writes_nothing_when_a_value_is_invalid(cache):
+    disk_cache = DiskCache(cache)
+    with pytest.raises(InvalidValueTypeException):
+        disk_cache.write_many({'a': b'1', 'b': 2})
+    assert not disk_cache.exists('a')
+
+
+def test_stages_batch_the_cache_accesses_of_their_ports(cache, monkeypatch):
+    @output_table(name='x')
+    @output_table(name='y')
+    class Split(NodeStage):
+        def run(self):
+            return pd.DataFrame({'a': [1]}), pd.DataFrame({'a': [2]})
+
+    @input_table(name='x')
+    @input_table(name='y')
+    class Join(NodeStage):
+        def run(self, x, y):
+            received.append((x['a'][0], y['a'][0]))
+
+    calls = []
+    read_many, write_many = DiskCache.read_many, DiskCache.write_many
+    monkeypatch.setattr(DiskCache, 'read_many', lambda self, keys: calls.append(
+        ('read', sorted(keys))) or read_many(self, keys))
+    monkeypatch.setattr(DiskCache, 'write_many', lambda self, items: calls.append(
+        ('write', sorted(items))) or write_many(self, items))
+
+    split = Split(cache=cache)
+    pipeline = Pipeline(cache)
+    pipeline.add_stages([split, Join(cache=cache).after(split)])
+    pipeline.start(in_memory=False)
+
+    assert received == [(1, 2)]
+    assert ('write', ['x', 'y']) in calls and ('read', ['x', 'y']) in calls
+    assert not any(call in calls for call in [
+        ('write', ['x']), ('write', ['y']), ('read', ['x']), ('read', ['y'])])
@@ -0,0 +1,87 @@
+import pandas as pd
+import pytest
+
+from gnime.nodes.io import CSVReaderNode
+
+frame = pd.DataFrame({'a': range(6), 'b': [1.5] * 6, 'c': list('uvwxyz')})
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / 'data.csv'
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def read(file_path, **config):
+    return CSVReaderNode('reader', config={'file_path': file_path, **config}).execute()
+
+
+@pytest.mark.parametrize('engine', ['c', 'python', 'pyarrow'])
+def test_csv_files_are_read_with_any_engine(path, engine):
+    pd.testing.assert_frame_equal(read(path, engine=engine), frame)
+
+
+def test_only_the_selected_columns_are_read(path):
+    assert list(read(path, usecols=['a', 'c']).columns) == ['a', 'c']
+
+
+def test_columns_are_read_with_the_given_dtypes(path):
+    dtypes = read(path, dtype={'a': 'int32', 'b': 'float32'}).dtypes
+    assert dtypes['a'] == 'int32' and dtypes['b'] == 'float32'
+
+
+def test_csv_files_can_be_memory_mapped(path):
+    pd.testing.assert_frame_equal(read(path, memory_map=True), frame)
+
+
+@pytest.mark.parametrize('option', [{'chunk_size': 2}, {'memory_map': True}])
+def test_the_pyarrow_engine_rejects_unsupported_options(path, option):
+    with pytest.raises(ValueError):
+        read(path, engine='pyarrow', **option)
+
+
+def test_chunked_reads_return_batches(path):
+    batches = read(path, chunk_size=4)
+    assert [len(batch) for batch in batches] == [4, 2]
+
+
+@pytest.fixture
+def shards(tmp_path):
+    for idx in range(5):
+        frame.iloc[idx:idx + 1].to_csv(tmp_path / ('shard-%d.csv' % idx), index=False)
+    return str(tmp_path / 'shard-*.csv')
+
+
+def test_glob_patterns_are_read_in_path_order(shards):
+    pd.testing.assert_frame_equal(read(shards, num_workers=3), frame.iloc[:5])
+
+
+def test_lists_of_paths_and_patterns_are_read(shards, path):
+    assert len(read([path, shards])) == 6 + 5
+
+
+def test_patterns_matching_nothing_are_rejected(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        read(str(tmp_path / 'missing-*.csv'))
+
+
+def test_shards_can_be_streamed_one_per_file(shards):
+    batches = list(read(shards, concat=False, num_workers=2))
+    assert len(batches) == 5
+    pd.testing.assert_frame_equal(pd.concat(batches, ignore_index=True), frame.iloc[:5])
+
+
+def test_shards_are_parsed_a_bounded_number_ahead(shards, monkeypatch):
+    started = []
+    parse = CSVReaderNode._read_csv
+
+    def counting(self, path, **kwargs):
+        started.append(path)
+        return parse(self, path, **kwargs)
+
+    monkeypatch.setattr(CSVReaderNode, '_read_csv', counting)
+    batches = read(shards, concat=False, num_workers=2)
+    next(batches)
+    assert len(started) <= 2
+    batches.close()
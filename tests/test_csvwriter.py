@@ -0,0 +1,53 @@
+import os
+
+import pandas as pd
+import pytest
+
+from gnime.exceptions import MissingDependencyException
+from gnime.nodes.io import CSVWriterNode
+from gnime.nodes.io.csvwriter import node as csvwriter
+
+frame = pd.DataFrame({'a': range(10), 'b': list('abcdefghij')})
+
+
+def batches():
+    yield frame.iloc[:4]
+    yield frame.iloc[4:]
+
+
+def write(path, data, **config):
+    CSVWriterNode('writer', config={'file_path': str(path), **config}).execute(data)
+
+
+@pytest.mark.parametrize('data', [lambda: frame, batches], ids=['frame', 'batches'])
+@pytest.mark.parametrize('config', [{}, {'chunk_size': 3}], ids=['serial', 'chunked'])
+def test_csv_files_round_trip(tmp_path, data, config):
+    write(tmp_path / 'out.csv', data(), **config)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'out.csv'), frame)
+    assert os.listdir(tmp_path) == ['out.csv']
+
+
+def test_csv_files_can_be_gzip_compressed(tmp_path):
+    write(tmp_path / 'out.csv.gz', frame, compression='gzip', chunk_size=3)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'out.csv.gz'), frame)
+
+
+def test_failed_writes_leave_the_target_untouched(tmp_path):
+    target = tmp_path / 'out.csv'
+    target.write_text('previous\n')
+
+    def failing():
+        yield frame
+        raise ValueError('upstream failed')
+
+    with pytest.raises(ValueError):
+        write(target, failing())
+    assert target.read_text() == 'previous\n'
+    assert os.listdir(tmp_path) == ['out.csv']
+
+
+def test_zstd_compression_requires_zstandard(tmp_path, monkeypatch):
+    monkeypatch.setattr(csvwriter, 'zstandard', None)
+    with pytest.raises(MissingDependencyException):
+        write(tmp_path / 'out.csv.zst', frame, compression='zstd')
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,59 @@
+import os
+
+import pandas as pd
+import pytest
+
+from gnime.exceptions import EmptyInputException
+from gnime.nodes.io import (
+    FeatherReaderNode, FeatherWriterNode, ParquetReaderNode, ParquetWriterNode)
+
+frame = pd.DataFrame({'year': [2023, 2023, 2024, 2024], 'value': [1.0, 2.0, 3.0, 4.0]})
+FORMATS = {
+    'parquet': (ParquetWriterNode, ParquetReaderNode),
+    'feather': (FeatherWriterNode, FeatherReaderNode),
+}
+
+
+def write(file_format, path, data, **config):
+    writer = FORMATS[file_format][0]
+    writer('writer', config={'file_path': str(path), **config}).execute(data)
+
+
+def read(file_format, path, **config):
+    reader = FORMATS[file_format][1]
+    return reader('reader', config={'file_path': str(path), **config}).execute()
+
+
+@pytest.fixture(params=list(FORMATS))
+def file_format(request):
+    return request.param
+
+
+def test_files_round_trip(file_format, tmp_path):
+    write(file_format, tmp_path / 'out', frame)
+    pd.testing.assert_frame_equal(read(file_format, tmp_path / 'out'), frame)
+
+
+def test_batches_are_written_one_after_the_other(file_format, tmp_path):
+    write(file_format, tmp_path / 'out', iter([frame.iloc[:2], frame.iloc[2:]]))
+    pd.testing.assert_frame_equal(read(file_format, tmp_path / 'out'), frame)
+
+
+def test_only_the_selected_columns_and_rows_are_read(file_format, tmp_path):
+    write(file_format, tmp_path / 'out', frame)
+    result = read(file_format, tmp_path / 'out', columns=['value'], filters=[['year', '=', 2024]])
+    assert result['value'].tolist() == [3.0, 4.0]
+    assert list(result.columns) == ['value']
+
+
+def test_partitioned_datasets_round_trip(file_format, tmp_path):
+    write(file_format, tmp_path / 'out', frame, partition_cols=['year'])
+    assert sorted(os.listdir(tmp_path / 'out')) == ['year=2023', 'year=2024']
+
+    result = read(file_format, tmp_path / 'out', filters=[['year', '=', 2023]])
+    assert result['value'].tolist() == [1.0, 2.0]
+
+
+def test_empty_streams_are_rejected(file_format, tmp_path):
+    with pytest.raises(EmptyInputException):
+        write(file_format, tmp_path / 'out', iter([]))
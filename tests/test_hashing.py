@@ -0,0 +1,58 @@
+import threading
+
+import pandas as pd
+
+from gnime.hashing import hash_config, hash_source, hash_value
+from gnime.nodes.io import CSVReaderNode
+
+
+class Point:
+    def __init__(self, x):
+        self.x = x
+
+
+def test_equal_frames_have_equal_digests():
+    frame = pd.DataFrame({'a': [1, 2], 'b': ['x', 'y']})
+    assert hash_value(frame) == hash_value(frame.copy())
+    assert hash_value(frame) != hash_value(frame.assign(a=[1, 3]))
+    assert hash_value(frame) != hash_value(frame.astype({'a': 'float64'}))
+
+
+def test_frames_with_unhashable_objects_are_hashed():
+    frame = pd.DataFrame({'a': [[1, 2], {'b': 3}]})
+    assert hash_value(frame) == hash_value(frame.copy())
+    assert hash_value(frame) != hash_value(pd.DataFrame({'a': [[1, 2], {'b': 4}]}))
+
+
+def test_equal_configs_have_equal_digests():
+    assert hash_config({'a': 1, 'b': [1, 2]}) == hash_config({'b': [1, 2], 'a': 1})
+    assert hash_config({'a': 1}) != hash_config({'a': 2})
+    assert hash_config(None) == hash_config(None)
+
+
+def test_configs_holding_objects_do_not_hash_by_identity():
+    assert hash_config({'p': Point(1)}) == hash_config({'p': Point(1)})
+    assert hash_config({'p': Point(1)}) != hash_config({'p': Point(2)})
+    assert hash_config({'s': {1, 2}, 'f': len}) == hash_config({'s': {2, 1}, 'f': len})
+    assert hash_config({'lock': threading.Lock()}) == hash_config({'lock': threading.Lock()})
+
+
+def test_node_configs_are_hashed_through_their_settings():
+    def config(path):
+        return CSVReaderNode('reader', config={'file_path': path}).config
+
+    assert hash_config(config('a.csv')) == hash_config(config('a.csv'))
+    assert hash_config(config('a.csv')) != hash_config(config('b.csv'))
+
+
+def test_source_digests_depend_on_the_code():
+    class First:
+        def run(self):
+            return 1
+
+    class Second:
+        def run(self):
+            return 2
+
+    assert hash_source(First) == hash_source(First)
+    assert hash_source(First) != hash_source(Second)
@@ -0,0 +1,23 @@
+import pandas as pd
+
+from gnime.nodes.node import collect_batches, iter_batches
+
+
+def test_values_that_are_not_iterators_are_single_batches():
+    frame = pd.DataFrame({'a': [1]})
+    assert list(iter_batches(frame)) == [frame]
+    assert collect_batches(frame) is frame
+
+
+def test_batches_are_collected_with_a_fresh_index():
+    # Batches read from separate files each start their index at 0.
+    collected = collect_batches(iter([pd.DataFrame({'a': [1, 2]}), pd.DataFrame({'a': [3]})]))
+    pd.testing.assert_frame_equal(collected, pd.DataFrame({'a': [1, 2, 3]}))
+
+
+def test_collecting_no_batches_gives_an_empty_frame():
+    assert collect_batches(iter([])).empty
+
+
+def test_batches_that_are_not_frames_are_collected_into_a_list():
+    assert collect_batches(iter([1, 2])) == [1, 2]
@@ -0,0 +1,567 @@
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from gnime.exceptions import InvalidExecutorTypeException
+from gnime.nodes.io import CSVReaderNode
+from gnime.nodes.node import input_table, output_table
+from gnime.pipeline import Pipeline
+from gnime.stage import NodeAdapterStage, NodeStage
+
+events = []
+events_lock = threading.Lock()
+
+
+def record(event: str, stage_name: str) -> None:
+    with events_lock:
+        events.append((event, stage_name))
+
+
+def ran() -> list:
+    return sorted(stage_name for event, stage_name in events if event == 'end')
+
+
+@pytest.fixture(autouse=True)
+def clear_events():
+    events.clear()
+    Double.fail = False
+    yield
+
+
+class Recorded(NodeStage):
+    """Stage recording when it starts and ends, sleeping in between."""
+
+    delay = 0.01
+
+    def run(self, *inputs):
+        record('start', self.name)
+        time.sleep(self.delay)
+        outputs = self.compute(*inputs)
+        record('end', self.name)
+        return outputs
+
+
+@output_table(name='x')
+class Load(Recorded):
+    def compute(self):
+        return [1, 2, 3]
+
+
+@input_table(name='x')
+@output_table(name='y')
+class Double(Recorded):
+    fail = False
+
+    def compute(self, x):
+        if self.fail:
+            raise ValueError('Double failed')
+        return [v * 2 for v in x]
+
+
+@input_table(name='x')
+@output_table(name='z')
+class Square(Recorded):
+    delay = 0.05
+
+    def compute(self, x):
+        return [v * v for v in x]
+
+
+@input_table(name='y')
+@input_table(name='z')
+@output_table(name='total')
+class Total(Recorded):
+    def compute(self, y, z):
+        return sum(y) + sum(z)
+
+
+@input_table(name='x')
+@output_table(name='scaled')
+class Scale(Recorded):
+    def compute(self, x):
+        return [v * self.config['factor'] for v in x]
+
+
+@output_table(name='w')
+class Generate(Recorded):
+    def compute(self):
+        return [0]
+
+
+def diamond(cache, namespace=None):
+    """Load -> (Double, Square) -> Total."""
+    load = Load(cache=cache)
+    double = Double(cache=cache).after(load)
+    square = Square(cache=cache).after(load)
+    total = Total(cache=cache).after(double).after(square)
+    pipeline = Pipeline(cache, namespace=namespace)
+    pipeline.add_stages([load, double, square, total])
+    return pipeline
+
+
+def output(pipeline: Pipeline, stage_name: str) -> object:
+    """The value of the first output port of a stage after a run."""
+    stage = pipeline.pipeline.nodes[stage_name]['stage_wrapper']
+    port = stage.output_ports[0]
+    if port.name in pipeline.memory_cache:
+        return pipeline.memory_cache.read(port.name)
+    return stage.read_port(port)
+
+
+def position(event: str, stage_name: str) -> int:
+    return events.index((event, stage_name))
+
+
+@pytest.mark.parametrize('num_cores', [None, 1, 4])
+def test_stages_start_after_their_preceding_stages(cache, num_cores):
+    with diamond(cache) as pipeline:
+        pipeline.start(num_cores=num_cores)
+        assert output(pipeline, 'Total') == 12 + 14
+
+    for producer, consumer in pipeline.pipeline.edges:
+        assert position('end', producer) < position('start', consumer)
+    assert ran() == ['Double', 'Load', 'Square', 'Total']
+
+
+def test_independent_stages_run_concurrently(cache):
+    with diamond(cache) as pipeline:
+        pipeline.start(num_cores=2)
+
+    # Square is slower than Double, so both must have started before either ended.
+    assert position('start', 'Square') < position('end', 'Double')
+
+
+@pytest.mark.parametrize('num_cores', [None, 2])
+def test_failure_stops_the_descendants_and_propagates(cache, num_cores):
+    Double.fail = True
+    with diamond(cache) as pipeline:
+        with pytest.raises(ValueError, match='Double failed'):
+            pipeline.start(num_cores=num_cores)
+
+        assert 'Total' not in ran()
+        # The pool is left idle, so the pipeline can run again.
+        Double.fail = False
+        events.clear()
+        pipeline.start(num_cores=num_cores)
+    assert ran() == ['Double', 'Load', 'Square', 'Total']
+
+
+def test_failure_lets_stages_in_flight_finish(cache):
+    Double.fail = True
+    with diamond(cache) as pipeline:
+        with pytest.raises(ValueError):
+            pipeline.start(num_cores=2)
+    assert ran() == ['Load', 'Square']
+
+
+@pytest.mark.parametrize('in_memory', [True, False])
+def test_resume_skips_the_completed_stages(cache, in_memory):
+    Double.fail = True
+    with diamond(cache) as pipeline:
+        with pytest.raises(ValueError):
+            pipeline.start(num_cores=2, in_memory=in_memory)
+    assert ran() == ['Load', 'Square']
+
+    Double.fail = False
+    events.clear()
+    with diamond(cache) as pipeline:
+        pipeline.start(num_cores=2, in_memory=in_memory, resume=True)
+        assert ran() == ['Double', 'Total']
+        assert output(pipeline, 'Total') == 12 + 14
+
+
+def test_resume_after_a_successful_run_reruns_everything(cache):
+    diamond(cache).start()
+    events.clear()
+    diamond(cache).start(resume=True)
+    assert ran() == ['Double', 'Load', 'Square', 'Total']
+
+
+def test_intermediate_ports_are_evicted(cache):
+    pipeline = diamond(cache)
+    pipeline.start(in_memory=False)
+
+    stages = {name: pipeline.pipeline.nodes[name]['stage_wrapper'] for name in pipeline.pipeline}
+    for name in ['Load', 'Double', 'Square']:
+        assert not stages[name].has_port(stages[name].output_ports[0])
+    # Ports no stage consumes are the results of the pipeline, and are kept.
+    assert stages['Total'].has_port(stages['Total'].output_ports[0])
+
+
+def test_intermediate_ports_are_evicted_from_memory(cache):
+    pipeline = diamond(cache)
+    pipeline.start(num_cores=2)
+    assert pipeline.memory_cache.keys() == ['total']
+
+
+def test_retained_ports_are_not_evicted(cache):
+    @output_table(name='x', retain=True)
+    class Load(Recorded):
+        def compute(self):
+            return [1, 2, 3]
+
+    load = Load(cache=cache)
+    double = Double(cache=cache).after(load)
+    pipeline = Pipeline(cache)
+    pipeline.add_stages([load, double])
+    pipeline.start(in_memory=False)
+    assert load.has_port(load.output_ports[0])
+
+
+def scaled(cache, factor):
+    """Load -> Scale(factor), and an unrelated Generate source."""
+    load = Load(cache=cache)
+    scale = Scale(cache=cache, config={'factor': factor}).after(load)
+    pipeline = Pipeline(cache)
+    pipeline.add_stages([load, scale, Generate(cache=cache)])
+    return pipeline
+
+
+def test_incremental_run_skips_unchanged_stages(cache, monkeypatch):
+    monkeypatch.setattr(Load, 'fingerprint', lambda self: 'unchanged')
+    scaled(cache, 2).start(incremental=True)
+    events.clear()
+
+    pipeline = scaled(cache, 2)
+    pipeline.start(incremental=True)
+    # Generate does not fingerprint the data it reads, so it always runs.
+    assert ran() == ['Generate']
+    assert output(pipeline, 'Scale') == [2, 4, 6]
+
+
+def test_incremental_run_reruns_stages_whose_config_changed(cache, monkeypatch):
+    monkeypatch.setattr(Load, 'fingerprint', lambda self: 'unchanged')
+    scaled(cache, 2).start(incremental=True)
+    events.clear()
+
+    pipeline = scaled(cache, 3)
+    pipeline.start(incremental=True)
+    assert ran() == ['Generate', 'Scale']
+    assert output(pipeline, 'Scale') == [3, 6, 9]
+
+
+def test_incremental_run_reruns_the_descendants_of_changed_sources(cache, monkeypatch):
+    monkeypatch.setattr(Load, 'fingerprint', lambda self: 'before')
+    scaled(cache, 2).start(incremental=True)
+    events.clear()
+
+    monkeypatch.setattr(Load, 'fingerprint', lambda self: 'after')
+    scaled(cache, 2).start(incremental=True)
+    assert ran() == ['Generate', 'Load', 'Scale']
+
+
+def test_incremental_run_after_a_full_run_reruns_the_sources(cache, monkeypatch):
+    monkeypatch.setattr(Load, 'fingerprint', lambda self: 'unchanged')
+    scaled(cache, 2).start(incremental=True)
+    scaled(cache, 2).start()
+    events.clear()
+
+    scaled(cache, 2).start(incremental=True)
+    assert ran() == ['Generate', 'Load', 'Scale']
+
+
+def test_incremental_run_detects_changed_files(cache, tmp_path):
+    path = tmp_path / 'data.csv'
+    pd.DataFrame({'a': [1, 2]}).to_csv(path, index=False)
+
+    def build():
+        reader = NodeAdapterStage(
+            cache, CSVReaderNode('reader', config={'file_path': str(path)}),
+            ports={'Output Data': 'x'})
+        pipeline = Pipeline(cache)
+        pipeline.add_stages([reader, Scale(cache=cache, config={'factor': 1}).after(reader)])
+        return pipeline
+
+    build().start(incremental=True)
+    events.clear()
+    build().start(incremental=True)
+    assert ran() == []
+
+    pd.DataFrame({'a': [1, 2, 3]}).to_csv(path, index=False)
+    build().start(incremental=True)
+    assert ran() == ['Scale']
+
+
+def test_incremental_run_after_a_failed_run_reruns_everything(cache, monkeypatch):
+    @input_table(name='scaled')
+    @output_table(name='shifted')
+    class Shift(Recorded):
+        fail = False
+
+        def compute(self, scaled):
+            if self.fail:
+                raise ValueError('Shift failed')
+            return [v + self.config['offset'] for v in scaled]
+
+    def build(factor, offset):
+        pipeline = scaled(cache, factor)
+        scale = pipeline.pipeline.nodes['Scale']['stage_wrapper']
+        pipeline.add_stage(Shift(cache=cache, config={'offset': offset}).after(scale))
+        return pipeline
+
+    monkeypatch.setattr(Load, 'fingerprint', lambda self: 'unchanged')
+    build(2, 0).start(incremental=True)
+
+    # The failed run overwrites the output of Scale with that of factor 3.
+    Shift.fail = True
+    with pytest.raises(ValueError):
+        build(3, 0).start()
+    Shift.fail = False
+    events.clear()
+
+    pipeline = build(2, 1)
+    pipeline.start(incremental=True)
+    assert ran() == ['Generate', 'Load', 'Scale', 'Shift']
+    assert output(pipeline, 'Shift') == [3, 5, 7]
+
+
+@output_table(name='pids')
+class Pid(NodeStage):
+    def run(self):
+        return [os.getpid()]
+
+
+@input_table(name='pids')
+@output_table(name='all_pids')
+class CollectPids(NodeStage):
+    def run(self, pids):
+        return pids + [os.getpid()]
+
+
+class Step(NodeStage):
+    @property
+    def name(self) -> str:
+        return self.config['name']
+
+    def run(self):
+        return None
+
+
+def test_process_executor_runs_stages_in_worker_processes(cache):
+    first = Pid(cache=cache)
+    second = CollectPids(cache=cache).after(first)
+    with Pipeline(cache) as pipeline:
+        pipeline.add_stages([first, second])
+        pipeline.start(num_cores=2, executor='process')
+
+    pids = second.read_port(second.output_ports[0])
+    assert len(pids) == 2 and os.getpid() not in pids
+
+
+def test_process_executor_handles_long_chains(cache):
+    # Stages are shipped without their preceding stages, which would
+    # otherwise be pickled recursively along the whole chain.
+    stages = [Pid(cache=cache)]
+    for idx in range(300):
+        stages.append(Step(cache=cache, config={'name': 'Step%d' % idx}).after(stages[-1]))
+    with Pipeline(cache) as pipeline:
+        pipeline.add_stages(stages)
+        pipeline.start(num_cores=2, executor='process')
+
+
+def test_the_pool_is_reused_across_runs(cache):
+    with diamond(cache) as pipeline:
+        pipeline.start(num_cores=2)
+        pool = pipeline.get_pool(2)
+        pipeline.start(num_cores=2)
+        assert pipeline.get_pool(2) is pool
+
+        # A different number of cores or executor replaces the pool.
+        pipeline.start(num_cores=3)
+        assert pipeline.get_pool(3) is not pool
+    assert pipeline._pool is None
+
+
+def test_closed_pipelines_can_start_again(cache):
+    pipeline = diamond(cache)
+    pipeline.start(num_cores=2)
+    threads = threading.active_count()
+    pipeline.close()
+    assert threading.active_count() < threads
+
+    events.clear()
+    pipeline.start(num_cores=2)
+    pipeline.close()
+    assert ran() == ['Double', 'Load', 'Square', 'Total']
+
+
+def test_unknown_executors_are_rejected(cache):
+    with pytest.raises(InvalidExecutorTypeException):
+        diamond(cache).start(num_cores=2, executor='fiber')
+    with pytest.raises(InvalidExecutorTypeException):
+        diamond(cache).start(executor='fiber')
+    assert events == []
+
+
+class Quick(Recorded):
+    def compute(self):
+        return None
+
+
+class Head(Recorded):
+    def compute(self):
+        return None
+
+
+class Tail(Recorded):
+    def compute(self):
+        return None
+
+
+def chains(cache):
+    """Quick, and Head -> Tail."""
+    head = Head(cache=cache)
+    pipeline = Pipeline(cache)
+    pipeline.add_stages([Quick(cache=cache), head, Tail(cache=cache).after(head)])
+    return pipeline
+
+
+def test_ready_stages_on_the_longest_path_start_first(cache):
+    with chains(cache) as pipeline:
+        pipeline.start(num_cores=1)
+        assert events[0] == ('start', 'Quick')
+
+        pipeline.write('durations', pipeline.serialize({'Quick': 1.0, 'Head': 1.0, 'Tail': 1.0}))
+        events.clear()
+        pipeline.start(num_cores=1)
+        assert events[0] == ('start', 'Head')
+
+
+def test_durations_are_recorded_as_moving_averages(cache):
+    pipeline = chains(cache)
+    pipeline.write('durations', pipeline.serialize({'Quick': 10.0}))
+    pipeline.start()
+
+    durations = pipeline.durations()
+    assert set(durations) == {'Quick', 'Head', 'Tail'}
+    assert 5.0 < durations['Quick'] < 5.5
+    assert durations['Head'] < 0.5
+
+
+def test_stages_without_history_are_estimated_from_the_others(cache):
+    pipeline = chains(cache)
+    pipeline.write('durations', pipeline.serialize({'Quick': 1.0, 'Head': 3.0}))
+    assert pipeline.estimated_durations() == {'Quick': 1.0, 'Head': 3.0, 'Tail': 2.0}
+
+
+class Sized(Recorded):
+    """Stage named and sized by its config."""
+
+    delay = 0.05
+
+    def __init__(self, cache, config):
+        Recorded.__init__(self, cache=cache, config=config)
+        self.memory_estimate = config['memory']
+
+    @property
+    def name(self) -> str:
+        return self.config['name']
+
+    def compute(self):
+        return None
+
+
+def peak_concurrency() -> int:
+    running = peak = 0
+    for event, _ in events:
+        running += 1 if event == 'start' else -1
+        peak = max(peak, running)
+    return peak
+
+
+def sized(cache, *memory):
+    pipeline = Pipeline(cache)
+    pipeline.add_stages([
+        Sized(cache, {'name': 'Sized%d' % idx, 'memory': m}) for idx, m in enumerate(memory)])
+    return pipeline
+
+
+def test_stages_are_admitted_within_the_memory_budget(cache):
+    with sized(cache, 100, 100, 100, 100) as pipeline:
+        pipeline.start(num_cores=4, memory_budget=250)
+    assert len(ran()) == 4
+    assert peak_concurrency() == 2
+
+
+def test_stages_larger_than_the_budget_run_on_their_own(cache):
+    with sized(cache, 100, 1000, 100) as pipeline:
+        pipeline.start(num_cores=3, memory_budget=250)
+    assert len(ran()) == 3
+    start = position('start', 'Sized1')
+    assert events[start + 1] == ('end', 'Sized1')
+
+
+def test_memory_is_not_bounded_without_a_budget(cache):
+    with sized(cache, 100, 100, 100, 100) as pipeline:
+        pipeline.start(num_cores=4)
+    assert peak_concurrency() == 4
+
+
+def test_port_data_is_spilled_when_over_budget(cache):
+    # Any process is over a budget of one byte, so all data is spilled.
+    with diamond(cache) as pipeline:
+        pipeline.start(num_cores=2, memory_budget=1)
+        assert pipeline.memory_cache.keys() == []
+        total = pipeline.pipeline.nodes['Total']['stage_wrapper']
+        assert total.read_port(total.output_ports[0]) == 12 + 14
+
+
+def namespaced(cache, namespace, factor):
+    load = Load(cache=cache)
+    scale = Scale(cache=cache, config={'factor': factor}).after(load)
+    pipeline = Pipeline(cache, namespace=namespace)
+    pipeline.add_stages([load, scale])
+    return pipeline, scale
+
+
+def test_pipelines_with_different_namespaces_run_concurrently(cache):
+    runs = [namespaced(cache, 'run%d' % factor, factor) for factor in range(1, 5)]
+    threads = [
+        threading.Thread(target=pipeline.start, kwargs={'num_cores': 2, 'in_memory': False})
+        for pipeline, _ in runs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for factor, (pipeline, scale) in enumerate(runs, 1):
+        pipeline.close()
+        assert scale.read_port(scale.output_ports[0]) == [factor, 2 * factor, 3 * factor]
+        assert pipeline.stored_snapshot()['stages']['Scale']['config'] == \
+            pipeline.snapshot()['stages']['Scale']['config']
+
+
+def test_runs_are_resumed_within_their_namespace(cache):
+    Double.fail = True
+    with pytest.raises(ValueError):
+        diamond(cache, namespace='first').start()
+    Double.fail = False
+    events.clear()
+
+    diamond(cache, namespace='second').start(resume=True)
+    assert ran() == ['Double', 'Load', 'Square', 'Total']
+    events.clear()
+    diamond(cache, namespace='first').start(resume=True)
+    # Serially, Double fails before Square runs, so only Load is reused.
+    assert ran() == ['Double', 'Square', 'Total']
+
+
+def test_the_snapshot_is_only_rewritten_when_the_pipeline_changes(cache, monkeypatch):
+    written = []
+    write = Pipeline.write
+    monkeypatch.setattr(Pipeline, 'write', lambda self, k, v: (
+        written.append(k) if k == 'pipeline' else None) or write(self, k, v))
+
+    pipeline, scale = namespaced(cache, '', 2)
+    pipeline.start()
+    pipeline.start()
+    assert written == ['pipeline']
+
+    scale.config = {'factor': 3}
+    pipeline.start()
+    assert written == ['pipeline'] * 2
+    assert pipeline.stored_snapshot()['stages']['Scale']['config'] == \
+        pipeline.snapshot()['stages']['Scale']['config']
@@ -0,0 +1,88 @@
+import json
+import sys
+
+import networkx as nx
+import pytest
+
+from gnime import plan
+
+# a -> b -> d, a -> c -> d, and an independent e.
+DURATIONS = {'a': 1.0, 'b': 4.0, 'c': 2.0, 'd': 1.0, 'e': 3.0}
+
+
+@pytest.fixture
+def graph():
+    graph = nx.DiGraph([('a', 'b'), ('a', 'c'), ('b', 'd'), ('c', 'd')])
+    graph.add_node('e')
+    return graph
+
+
+def test_upward_ranks_are_the_longest_remaining_paths(graph):
+    assert plan.upward_ranks(graph, DURATIONS) == {
+        'a': 6.0, 'b': 5.0, 'c': 3.0, 'd': 1.0, 'e': 3.0}
+
+
+def test_the_critical_path_is_the_longest_chain(graph):
+    assert plan.critical_path(graph, DURATIONS) == (['a', 'b', 'd'], 6.0)
+    assert plan.critical_path(nx.DiGraph(), {}) == ([], 0.0)
+
+
+def test_makespans_are_estimated_by_simulating_the_scheduler(graph):
+    assert plan.estimate_makespan(graph, DURATIONS, 1) == sum(DURATIONS.values())
+    # a, then b and c side by side while e waits for a free worker.
+    assert plan.estimate_makespan(graph, DURATIONS, 2) == 6.0
+    assert plan.estimate_makespan(graph, DURATIONS, 3) == 6.0
+
+
+def test_execution_plans_report_the_useful_workers(graph):
+    report = plan.ExecutionPlan(
+        critical_path=['a', 'b', 'd'], critical_path_length=6.0, total_work=11.0,
+        level_widths=[2, 2, 1],
+        makespans={n: plan.estimate_makespan(graph, DURATIONS, n) for n in (1, 2, 3)},
+        durations=DURATIONS)
+
+    assert report.useful_workers == 2
+    assert report.average_parallelism == pytest.approx(11.0 / 6.0)
+    assert json.loads(json.dumps(report.to_dict()))['useful_workers'] == 2
+    assert 'Adding workers beyond 2' in report.format()
+
+
+PIPELINE_MODULE = '''
+from gnime.pipeline import Pipeline
+from gnime.stage import NodeStage
+import diskcache
+
+
+class First(NodeStage):
+    def run(self):
+        pass
+
+
+class Second(NodeStage):
+    def run(self):
+        pass
+
+
+def build():
+    cache = diskcache.Cache(%r)
+    first = First(cache=cache)
+    pipeline = Pipeline(cache)
+    pipeline.add_stages([first, Second(cache=cache).after(first)])
+    return pipeline
+'''
+
+
+def test_the_report_is_printed_from_the_command_line(tmp_path, monkeypatch, capsys):
+    (tmp_path / 'plan_pipeline.py').write_text(PIPELINE_MODULE % str(tmp_path / 'cache'))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, 'path', list(sys.path))
+
+    monkeypatch.delitem(sys.modules, 'plan_pipeline', raising=False)
+    # The durations the report is made of are those recorded by a run.
+    plan.load_pipeline('plan_pipeline:build').start()
+
+    plan.main(['plan_pipeline:build', '--json'])
+    report = json.loads(capsys.readouterr().out)
+    assert report['critical_path'] == ['First', 'Second']
+    assert report['level_widths'] == [1, 1]
+    assert report['makespans'] == {'1': pytest.approx(report['total_work'])}
@@ -0,0 +1,69 @@
+import json
+import time
+
+import numpy as np
+
+from gnime.nodes.node import input_table, output_table
+from gnime.pipeline import Pipeline
+from gnime.profiling import RunReport
+from gnime.stage import NodeStage
+
+
+@output_table(name='x')
+class Produce(NodeStage):
+    def run(self):
+        time.sleep(0.05)
+        return list(range(1000))
+
+
+@input_table(name='x')
+@output_table(name='y')
+class Allocate(NodeStage):
+    def run(self, x):
+        block = np.ones(50 * 1024 * 1024 // 8)
+        time.sleep(0.1)
+        return int(block.sum()) + len(x)
+
+
+def profiled_run(cache, **kwargs) -> RunReport:
+    produce = Produce(cache=cache)
+    pipeline = Pipeline(cache)
+    pipeline.add_stages([produce, Allocate(cache=cache).after(produce)])
+    pipeline.start(**kwargs)
+    return pipeline.run_report
+
+
+def test_every_stage_that_ran_is_profiled(cache):
+    report = profiled_run(cache, in_memory=False)
+    produce, allocate = report.profiles
+
+    assert [produce.stage, allocate.stage] == ['Produce', 'Allocate']
+    assert produce.wall_time >= 0.05 and produce.phases['run'] >= 0.05
+    assert produce.start <= allocate.start
+    assert report.wall_time >= produce.wall_time + allocate.wall_time
+    assert produce.bytes_written['x'] > 0
+    assert allocate.bytes_read['x'] == produce.bytes_written['x']
+
+
+def test_the_memory_footprint_of_stages_is_measured(cache):
+    allocate = profiled_run(cache).profiles[1]
+    assert allocate.memory_footprint > 25 * 1024 * 1024
+
+
+def test_reports_are_exported_to_json(cache, tmp_path):
+    report = profiled_run(cache)
+    exported = json.loads(report.to_json(str(tmp_path / 'report.json')))
+
+    assert [stage['stage'] for stage in exported['stages']] == ['Produce', 'Allocate']
+    assert exported == json.loads((tmp_path / 'report.json').read_text())
+
+
+def test_reports_are_exported_to_chrome_traces(cache, tmp_path):
+    report = profiled_run(cache)
+    trace = report.to_chrome_trace(str(tmp_path / 'trace.json'))
+
+    stages = [event for event in trace['traceEvents'] if event['cat'] == 'stage']
+    assert [event['name'] for event in stages] == ['Produce', 'Allocate']
+    phases = {event['name'] for event in trace['traceEvents'] if event['cat'] == 'phase'}
+    assert {'pre_execute', 'run', 'post_execute'} <= phases
+    assert json.loads((tmp_path / 'trace.json').read_text()) == trace
@@ -0,0 +1,72 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gnime.exceptions import MissingDependencyException, SerializationException
+from gnime.serialization import (
+    FRAME_MAGIC, AutoSerializer, CloudPickleSerializer, Pickle5Serializer, PickleSerializer,
+    available_codecs, deserialize_any)
+
+frame = pd.DataFrame({'a': np.arange(100000, dtype='float64'), 'b': np.zeros(100000)})
+
+
+@pytest.mark.parametrize('serializer', [
+    PickleSerializer(),
+    CloudPickleSerializer(),
+    Pickle5Serializer(),
+    *[Pickle5Serializer(codec) for codec in available_codecs()],
+    AutoSerializer(),
+    AutoSerializer(min_size=0),
+], ids=repr)
+def test_payloads_round_trip_whatever_the_serializer(serializer):
+    payload = serializer.serialize(frame)
+    pd.testing.assert_frame_equal(deserialize_any(payload), frame)
+    pd.testing.assert_frame_equal(serializer.deserialize(payload), frame)
+
+
+def test_large_buffers_are_framed_out_of_band():
+    assert Pickle5Serializer().serialize(frame).startswith(FRAME_MAGIC)
+    # Values without large buffers stay plain pickle streams.
+    assert Pickle5Serializer().serialize({'a': 1}) == pickle.dumps({'a': 1}, protocol=5)
+
+
+def test_compressible_buffers_are_compressed():
+    payload = AutoSerializer().serialize(np.zeros(10 ** 6))
+    assert len(payload) < 10 ** 6 / 10
+
+
+def test_incompressible_buffers_are_stored_as_they_are():
+    values = np.random.default_rng(0).random(10 ** 5)
+    payload = AutoSerializer().serialize(values)
+    assert values.nbytes < len(payload) < values.nbytes + 1024
+    np.testing.assert_array_equal(deserialize_any(payload), values)
+
+
+@pytest.mark.parametrize('value', [np.array([], dtype='float64'), b'', pd.DataFrame()], ids=repr)
+def test_empty_buffers_round_trip(value):
+    payload = AutoSerializer(min_size=0).serialize(value)
+    restored = deserialize_any(payload)
+    assert type(restored) is type(value) and len(restored) == 0
+
+
+def test_deserialized_arrays_are_writable_unless_requested_otherwise():
+    payload = Pickle5Serializer().serialize(np.arange(10 ** 5))
+    assert deserialize_any(payload).flags.writeable
+
+    values = deserialize_any(payload, writable=False)
+    assert not values.flags.writeable
+    # The array is a view of the payload rather than a copy.
+    assert np.shares_memory(values, np.frombuffer(payload, dtype='uint8'))
+
+
+def test_unknown_codecs_are_rejected():
+    with pytest.raises(SerializationException):
+        Pickle5Serializer('snappy')
+
+
+@pytest.mark.parametrize('codec', [c for c in ['lz4', 'zstd'] if c not in available_codecs()])
+def test_missing_codecs_are_reported(codec):
+    with pytest.raises(MissingDependencyException):
+        Pickle5Serializer(codec)
@@ -0,0 +1,99 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from gnime.nodes.node import input_table, output_table
+from gnime.pipeline import Pipeline
+from gnime.stage import NodeStage, StageExecutor, done_key, in_progress_key
+
+runs = []
+
+
+@pytest.fixture(autouse=True)
+def clear_runs():
+    runs.clear()
+    yield
+
+
+@output_table(name='x')
+class Load(NodeStage):
+    def run(self):
+        return pd.DataFrame({'a': [1, 2, 3], 'tags': [['x'], ['y'], {'z': 1}]})
+
+
+@input_table(name='x')
+@output_table(name='y')
+class Scale(NodeStage):
+    memoize = True
+
+    def run(self, x):
+        runs.append(self.name)
+        return x['a'] * self.config['factor']
+
+
+def run(cache, factor, load=Load):
+    load = load(cache=cache)
+    scale = Scale(cache=cache, config={'factor': factor}).after(load)
+    pipeline = Pipeline(cache)
+    pipeline.add_stages([load, scale])
+    pipeline.start(in_memory=False)
+    return scale.read_port(scale.output_ports[0]).tolist()
+
+
+def test_memoized_stages_reuse_their_outputs(cache):
+    assert run(cache, 2) == [2, 4, 6]
+    assert run(cache, 2) == [2, 4, 6]
+    assert runs == ['Scale']
+
+
+def test_memoized_stages_rerun_when_their_config_changes(cache):
+    run(cache, 2)
+    assert run(cache, 3) == [3, 6, 9]
+    assert runs == ['Scale', 'Scale']
+
+
+def test_memoized_stages_rerun_when_their_inputs_change(cache):
+    @output_table(name='x')
+    class Other(NodeStage):
+        def run(self):
+            return pd.DataFrame({'a': [4, 5], 'tags': [['x'], ['y']]})
+
+    run(cache, 2)
+    assert run(cache, 2, load=Other) == [8, 10]
+    assert runs == ['Scale', 'Scale']
+
+
+def test_stage_executors_record_progress(cache):
+    pipeline = Pipeline(cache)
+    with StageExecutor(cache, ['a', 'b'], profile=False):
+        assert pipeline.progress() == {'in_progress': 2, 'done': 0}
+        assert cache.get(done_key('a')) is None
+    assert pipeline.progress() == {'in_progress': 0, 'done': 2}
+    assert cache.get(done_key('a')) is not None
+
+
+def test_failed_stages_are_not_recorded_as_done(cache):
+    with pytest.raises(ValueError):
+        with StageExecutor(cache, ['a'], profile=False):
+            raise ValueError()
+    assert Pipeline(cache).progress() == {'in_progress': 0, 'done': 0}
+    assert cache.get(in_progress_key('a')) is None
+
+
+def test_concurrent_stage_executors_do_not_lose_updates(cache):
+    def execute(idx):
+        with StageExecutor(cache, ['stage%d' % idx], profile=False):
+            pass
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(execute, range(100)))
+    assert Pipeline(cache).progress() == {'in_progress': 0, 'done': 100}
+
+
+def test_the_run_state_is_cleared_after_a_successful_run(cache):
+    pipeline = Pipeline(cache)
+    pipeline.add_stages([Load(cache=cache)])
+    pipeline.start()
+    assert pipeline.progress() == {'in_progress': 0, 'done': 0}
+    assert cache.get(done_key('Load')) is None
@@ -0,0 +1,169 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from gnime.exceptions import BatchMismatchException
+from gnime.nodes.io import CSVReaderNode, CSVWriterNode
+from gnime.nodes.node import BatchMode, input_table, output_table
+from gnime.pipeline import Pipeline
+from gnime.stage import NodeAdapterStage, NodeStage
+
+calls = []
+
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    calls.clear()
+    yield
+
+
+def batches(sizes: list, start: int = 0):
+    for size in sizes:
+        yield pd.DataFrame({'a': range(start, start + size)})
+        start += size
+
+
+@output_table(name='x')
+class Source(NodeStage):
+    def run(self):
+        return batches([3, 3, 3, 1])
+
+
+@input_table(name='x')
+@output_table(name='y')
+class Increment(NodeStage):
+    batch_mode = BatchMode.ROW
+
+    def run(self, x):
+        calls.append(('Increment', len(x)))
+        return x + 1
+
+
+@input_table(name='y')
+class Collect(NodeStage):
+    batch_mode = BatchMode.BLOCKING
+
+    def run(self, y):
+        calls.append(('Collect', y['a'].tolist()))
+
+
+@input_table(name='y')
+class Consume(NodeStage):
+    batch_mode = BatchMode.STREAM
+
+    def run(self, y):
+        for batch in y:
+            calls.append(('Consume', len(batch)))
+
+
+def test_row_stages_are_called_once_per_batch(cache):
+    source = Source(cache=cache)
+    increment = Increment(cache=cache).after(source)
+    pipeline = Pipeline(cache)
+    pipeline.add_stages([source, increment, Collect(cache=cache).after(increment)])
+    pipeline.stream(queue_size=1)
+
+    assert calls[:4] == [('Increment', 3), ('Increment', 3), ('Increment', 3), ('Increment', 1)]
+    assert calls[4] == ('Collect', list(range(1, 11)))
+
+
+def test_stream_stages_get_an_iterator_of_batches(cache):
+    source = Source(cache=cache)
+    increment = Increment(cache=cache).after(source)
+    pipeline = Pipeline(cache)
+    pipeline.add_stages([source, increment, Consume(cache=cache).after(increment)])
+    pipeline.stream()
+
+    assert [call for call in calls if call[0] == 'Consume'] == [
+        ('Consume', 3), ('Consume', 3), ('Consume', 3), ('Consume', 1)]
+
+
+@pytest.mark.parametrize('batch_mode', [BatchMode.BLOCKING, BatchMode.STREAM])
+def test_stages_reading_inputs_one_after_the_other_do_not_deadlock(cache, batch_mode):
+    @output_table(name='x')
+    class Rows(NodeStage):
+        def run(self):
+            return batches([1] * 50)
+
+    @input_table(name='x')
+    @input_table(name='y')
+    class Join(NodeStage):
+        def run(self, x, y):
+            if batch_mode == BatchMode.STREAM:
+                x, y = list(x), list(y)
+            calls.append(('Join', len(x), len(y)))
+
+    Join.batch_mode = batch_mode
+    rows = Rows(cache=cache)
+    increment = Increment(cache=cache).after(rows)
+    pipeline = Pipeline(cache)
+    pipeline.add_stages([rows, increment, Join(cache=cache).after(rows).after(increment)])
+
+    # Rows feeds Join both directly and through Increment.
+    thread = threading.Thread(target=pipeline.stream, kwargs={'queue_size': 4}, daemon=True)
+    thread.start()
+    thread.join(timeout=30)
+    assert not thread.is_alive()
+    assert calls[-1] == ('Join', 50, 50)
+
+
+def test_row_stages_reject_inputs_with_different_numbers_of_batches(cache):
+    @output_table(name='z')
+    class Shorter(NodeStage):
+        def run(self):
+            return batches([3, 3])
+
+    @input_table(name='x')
+    @input_table(name='z')
+    class Pair(NodeStage):
+        def run(self, x, z):
+            calls.append(('Pair', len(x)))
+
+    source, shorter = Source(cache=cache), Shorter(cache=cache)
+    pipeline = Pipeline(cache)
+    pipeline.add_stages([source, shorter, Pair(cache=cache).after(source).after(shorter)])
+    with pytest.raises(BatchMismatchException):
+        pipeline.stream()
+
+
+def test_failures_abort_the_stream(cache):
+    @input_table(name='x')
+    class Fail(NodeStage):
+        def run(self, x):
+            raise ValueError('Fail failed')
+
+    source = Source(cache=cache)
+    pipeline = Pipeline(cache)
+    pipeline.add_stages([source, Fail(cache=cache).after(source)])
+    with pytest.raises(ValueError, match='Fail failed'):
+        pipeline.stream(queue_size=1)
+
+
+def test_library_nodes_stream_in_chunks(cache, tmp_path):
+    source, target = tmp_path / 'source.csv', tmp_path / 'target.csv'
+    pd.DataFrame({'a': range(10)}).to_csv(source, index=False)
+
+    reader = NodeAdapterStage(
+        cache, CSVReaderNode('reader', config={'file_path': str(source), 'chunk_size': 3}),
+        ports={'Output Data': 'x'})
+    increment = Increment(cache=cache).after(reader)
+    writer = NodeAdapterStage(
+        cache, CSVWriterNode('writer', config={'file_path': str(target)}),
+        ports={'Input Data': 'y'}).after(increment)
+    pipeline = Pipeline(cache)
+    pipeline.add_stages([reader, increment, writer])
+    pipeline.stream()
+
+    assert calls == [('Increment', 3)] * 3 + [('Increment', 1)]
+    assert pd.read_csv(target)['a'].tolist() == list(range(1, 11))
+
+
+def test_iterator_outputs_are_collected_outside_streaming_runs(cache):
+    source = Source(cache=cache)
+    increment = Increment(cache=cache).after(source)
+    pipeline = Pipeline(cache)
+    pipeline.add_stages([source, increment, Collect(cache=cache).after(increment)])
+    pipeline.start()
+
+    assert calls == [('Increment', 10), ('Collect', list(range(1, 11)))]